@@ -0,0 +1,31 @@
+import hmac
+import os
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Request
+from app.services.container import ServiceContainer
+
+def get_optional_services(request: Request) -> Optional[ServiceContainer]:
+    """The service container, or None while it is not started (for health probes)"""
+    services = getattr(request.app.state, "services", None)
+    return services if services is not None and services.started else None
+
+def get_services(request: Request) -> ServiceContainer:
+    """The service container started by the app lifespan"""
+    services = get_optional_services(request)
+    if services is None:
+        raise HTTPException(status_code=503, detail="Services not initialized")
+    return services
+
+def get_orchestrator(services: ServiceContainer = Depends(get_services)):
+    return services.orchestrator
+
+def get_sms_processor(services: ServiceContainer = Depends(get_services)):
+    return services.sms_processor
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Admin routes need the X-Admin-Token header to match ADMIN_TOKEN; unset disables them"""
+    admin_token = os.getenv("ADMIN_TOKEN", "")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin API disabled (ADMIN_TOKEN not set)")
+    if not hmac.compare_digest(x_admin_token or "", admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -1,21 +1,40 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
+from typing import Optional
 import uvicorn
 import os
 from dotenv import load_dotenv
-from app.services.knowledge_base import AgricultureKnowledgeBase
-from app.services.free_ai_clients import FreeAIOrchestrator
-from app.routers import sms
+from app.services.container import ServiceContainer
+from app.services.keyword_answers import keyword_response
+from app.services.streaming import SSE_HEADERS, result_events, sse_stream
+from app.routers import admin, sms
+from app.dependencies import get_services, get_optional_services
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("🌾 Initializing AgriSage AI API...")
+    
+    # One knowledge base and orchestrator per process, shared by every router
+    app.state.services = ServiceContainer("app.services.free_ai_clients:FreeAIOrchestrator")
+    # Load the embedder and index in the background so /health answers during cold starts
+    app.state.services.load_in_background()
+    
+    print("✅ AgriSage AI API accepting requests (knowledge base loading in the background)")
+    yield
+    await app.state.services.stop()
+
 # Initialize FastAPI
 app = FastAPI(
     title="FarmLink API",
     description="Agricultural Intelligence Assistant API - 100% FREE",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -27,28 +46,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global service instances
-knowledge_base = None
-agrisage_service = None
-
-@app.on_event("startup")
-async def startup_event():
-    global knowledge_base, agrisage_service
-    print("🌾 Initializing AgriSage AI API...")
-    
-    # Initialize knowledge base
-    knowledge_base = AgricultureKnowledgeBase()
-    
-    # Initialize AI orchestrator
-    agrisage_service = FreeAIOrchestrator(knowledge_base)
-    
-    print("✅ AgriSage AI API ready!")
-
 # Request/Response Models
 class QuestionRequest(BaseModel):
     question: str
     language: str = "en"
     context: str = ""
+    # Optional knowledge base filters, e.g. crop="rice", knowledge_language="hi"
+    crop: Optional[str] = None
+    category: Optional[str] = None
+    knowledge_language: Optional[str] = None
+
+    def knowledge_filters(self) -> dict:
+        filters = {"crop": self.crop, "category": self.category, "language": self.knowledge_language}
+        return {field: value for field, value in filters.items() if value}
 
 class AgriResponse(BaseModel):
     response: str
@@ -68,6 +78,7 @@ class HealthResponse(BaseModel):
 
 # Include routers
 app.include_router(sms.router)
+app.include_router(admin.router)
 
 # Routes
 @app.get("/")
@@ -87,19 +98,30 @@ async def root():
     }
 
 @app.get("/health", response_model=HealthResponse)
-async def health_check():
+async def health_check(services: Optional[ServiceContainer] = Depends(get_optional_services)):
+    service_status = {
+        "knowledge_base": "active",
+        "ai_orchestrator": "active",
+        "sms_service": "active",
+        "groq_client": "configured",
+        "huggingface_client": "configured",
+        "ollama_client": "optional",
+        "knowledge_search": services.search_stats() if services else "starting",
+        "query_cache": "starting"
+    }
+    if services:
+        service_status["ai_services"] = await services.orchestrator.get_service_status()
+        # Process-mode searches are cached inside the worker processes, so there is nothing to report here
+        query_cache = services.query_cache_stats()
+        if query_cache is None:
+            del service_status["query_cache"]
+        else:
+            service_status["query_cache"] = query_cache
     return HealthResponse(
         status="healthy",
         version="2.0.0",
         uptime="running",
-        services={
-            "knowledge_base": "active",
-            "ai_orchestrator": "active",
-            "sms_service": "active",
-            "groq_client": "configured",
-            "huggingface_client": "configured",
-            "ollama_client": "optional"
-        },
+        services=service_status,
         cost_info={
             "api_usage": "FREE",
             "sms_limits": {
@@ -115,20 +137,29 @@ async def health_check():
         }
     )
 
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness probe: 200 once the knowledge base and AI services are loaded, 503 until then"""
+    readiness = request.app.state.services.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
 @app.post("/ask", response_model=AgriResponse)
-async def ask_question(request: QuestionRequest):
+async def ask_question(request: QuestionRequest,
+                       services: Optional[ServiceContainer] = Depends(get_optional_services)):
     try:
         import time
         start_time = time.time()
         
-        if not agrisage_service:
-            raise HTTPException(status_code=503, detail="AgriSage AI not initialized")
-        
         # Generate response using FREE services
-        result = await agrisage_service.generate_response_free(
-            question=request.question,
-            language=request.language
-        )
+        if services is None:
+            # Still loading: answer from the keyword tier instead of failing
+            result = keyword_response(request.question)
+        else:
+            result = await services.orchestrator.generate_response_free(
+                question=request.question,
+                language=request.language,
+                filters=request.knowledge_filters()
+            )
         
         processing_time = time.time() - start_time
         
@@ -145,6 +176,31 @@ async def ask_question(request: QuestionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
 
+@app.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest,
+                              services: Optional[ServiceContainer] = Depends(get_optional_services)):
+    """/ask as Server-Sent Events: token events as the answer is generated, then a done event with its metadata"""
+    if services is None:
+        # Still loading: answer from the keyword tier instead of failing
+        events = result_events(keyword_response(request.question))
+    else:
+        events = services.orchestrator.stream_response_free(
+            question=request.question,
+            language=request.language,
+            filters=request.knowledge_filters()
+        )
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@app.get("/memory")
+async def get_memory_usage(services: ServiceContainer = Depends(get_services)):
+    """Approximate memory used by each shared component of this worker"""
+    return services.memory_usage()
+
+@app.get("/ollama/models")
+async def get_ollama_models(services: ServiceContainer = Depends(get_services)):
+    """Ollama models and which of them are installed, from the cached inventory"""
+    return services.orchestrator.ollama_client.inventory()
+
 @app.get("/categories")
 async def get_categories():
     """Get available agricultural categories"""
@@ -0,0 +1,39 @@
+from typing import Any, Dict, List, Optional, Union
+import os
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from app.dependencies import get_services, require_admin
+from app.services.container import ServiceContainer
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+class ReloadRequest(BaseModel):
+    # Defaults to the corpus the knowledge base was started with (KB_CORPUS_PATH)
+    corpus_path: Optional[str] = None
+
+class EntriesUpdate(BaseModel):
+    # Entries use the corpus schema; an entry whose id already exists replaces it
+    add: List[Dict[str, Any]] = []
+    remove_ids: List[Union[int, float, str]] = []
+
+@router.get("/knowledge")
+async def knowledge_status(services: ServiceContainer = Depends(get_services)):
+    """Version being served and progress of the latest reload or update"""
+    return services.knowledge_status()
+
+@router.post("/knowledge/reload", status_code=202)
+async def reload_knowledge(request: ReloadRequest, services: ServiceContainer = Depends(get_services)):
+    """Rebuild from a corpus file in the background; searches keep using the current version meanwhile"""
+    if request.corpus_path and not os.path.isfile(request.corpus_path):
+        raise HTTPException(status_code=400, detail=f"Corpus file not found: {request.corpus_path}")
+    return await services.reload_knowledge(request.corpus_path)
+
+@router.post("/knowledge/entries")
+async def update_entries(request: EntriesUpdate, services: ServiceContainer = Depends(get_services)):
+    """Add, replace or remove individual entries without a restart"""
+    if not request.add and not request.remove_ids:
+        raise HTTPException(status_code=400, detail="Nothing to add or remove")
+    try:
+        return await services.update_knowledge(request.add, request.remove_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,19 +1,13 @@
-from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from app.services.sms_service import SMSQueryProcessor, FreeSMSManager
-from app.services.knowledge_base import AgricultureKnowledgeBase
-from app.services.free_ai_clients import FreeAIOrchestrator
+from app.dependencies import get_sms_processor
 import logging
 
 router = APIRouter(prefix="/sms", tags=["SMS"])
 logger = logging.getLogger(__name__)
 
-# Initialize services
-knowledge_base = AgricultureKnowledgeBase()
-agrisage_service = FreeAIOrchestrator(knowledge_base)
-sms_processor = SMSQueryProcessor(agrisage_service)
-
 @router.post("/webhook/twilio")
-async def twilio_webhook(request: Request):
+async def twilio_webhook(request: Request, sms_processor: SMSQueryProcessor = Depends(get_sms_processor)):
     """Handle incoming SMS from Twilio Sandbox"""
     try:
         form_data = await request.form()
@@ -39,7 +33,7 @@ async def twilio_webhook(request: Request):
         </Response>"""
 
 @router.post("/webhook/textlocal")
-async def textlocal_webhook(request: Request):
+async def textlocal_webhook(request: Request, sms_processor: SMSQueryProcessor = Depends(get_sms_processor)):
     """Handle incoming SMS from TextLocal"""
     try:
         form_data = await request.form()
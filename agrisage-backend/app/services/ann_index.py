@@ -0,0 +1,275 @@
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq8", "hnsw_sq8")
+
+# "auto" picks an index type from the corpus size, see choose_index_type()
+DEFAULT_INDEX_TYPE = os.getenv("KB_INDEX_TYPE", "auto")
+IVF_NLIST = int(os.getenv("KB_IVF_NLIST", "0"))  # 0 = derived from corpus size
+PQ_M = int(os.getenv("KB_PQ_M", "48"))
+HNSW_M = int(os.getenv("KB_HNSW_M", "32"))
+NPROBE = int(os.getenv("KB_NPROBE", "16"))
+EF_SEARCH = int(os.getenv("KB_EF_SEARCH", "64"))
+# Compact storage: "auto" picks int8/PQ-coded indexes and the float matrix is not kept in memory
+COMPACT_STORAGE = os.getenv("KB_COMPACT_STORAGE", "false").lower() == "true"
+
+# Measured with `--synthetic N` (384-d clustered vectors, 200 held-out queries, recall@10, one
+# query at a time, 1 CPU, defaults nprobe 16 / efSearch 64):
+#
+#   entries  type       recall  top1   p50 ms  index MB
+#   50k      flat       1.000   1.000   6.42     73
+#   50k      hnsw       0.960   0.975   0.26     86
+#   50k      sq8        0.991   0.985   2.45     18
+#   50k      hnsw_sq8   0.940   0.935   0.29     31
+#   200k     flat       1.000   1.000  32.33    293
+#   200k     hnsw       0.909   0.900   0.32    345   (efSearch 256: 0.946 / 0.940 at 0.60 ms)
+#   200k     sq8        0.992   0.965  17.22     73
+#   200k     hnsw_sq8   0.897   0.885   0.38    125   (efSearch 256: 0.946 / 0.925 at 0.68 ms)
+#   200k     ivf_pq     0.718   0.285   0.22     14
+#
+# Exact search stays within a few ms up to ~50k and grows linearly past it, so graph
+# search takes over there; KB_EF_SEARCH trades its recall back for latency. ivf_flat
+# scored higher on this synthetic data, but its list count follows the corpus size, so
+# updates would retrain it. ivf_pq is only for corpora whose vectors no longer fit in
+# memory; 1M entries was not measured (this machine cannot hold the reference index).
+FLAT_MAX_ENTRIES = 50_000
+HNSW_MAX_ENTRIES = 1_000_000
+# k-means wants ~39 training points per centroid; PQ trains 256 centroids per sub-quantizer
+MIN_POINTS_PER_LIST = 39
+PQ_MIN_TRAINING = 256 * MIN_POINTS_PER_LIST
+MAX_TRAINING_SAMPLE = 200_000
+ADD_BATCH_SIZE = 65_536
+# Filtered ANN search widens its beam as the allowed share of the index shrinks
+MAX_FILTERED_EF_SEARCH = 1024
+
+def choose_index_type(num_entries: int, compact: bool = COMPACT_STORAGE) -> str:
+    """Exact search while it is cheap, graph search for mid-sized corpora, compressed IVF beyond"""
+    if num_entries < FLAT_MAX_ENTRIES:
+        return "sq8" if compact else "flat"
+    if num_entries < HNSW_MAX_ENTRIES:
+        return "hnsw_sq8" if compact else "hnsw"
+    return "ivf_pq"
+
+def resolve_index_type(index_type: str, num_entries: int, compact: bool = COMPACT_STORAGE) -> str:
+    """Turn a configured index type into one that can be built for this corpus size"""
+    if index_type == "auto":
+        return choose_index_type(num_entries, compact)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}' (expected auto or one of {', '.join(INDEX_TYPES)})")
+    if index_type == "ivf_flat" and num_entries < MIN_POINTS_PER_LIST:
+        logger.warning(f"Too few entries ({num_entries}) to train {index_type}; using flat")
+        return "flat"
+    if index_type == "ivf_pq" and num_entries < PQ_MIN_TRAINING:
+        logger.warning(f"Too few entries ({num_entries}) to train {index_type}; using flat")
+        return "flat"
+    return index_type
+
+def requires_training(index_type: str) -> bool:
+    # The int8 scalar quantizer learns per-dimension value ranges
+    return index_type.startswith("ivf") or index_type.endswith("sq8")
+
+def default_nlist(num_entries: int) -> int:
+    """Number of IVF lists: ~4*sqrt(n), capped so every list gets enough training points"""
+    if IVF_NLIST:
+        return IVF_NLIST
+    return max(1, min(int(4 * math.sqrt(num_entries)), num_entries // MIN_POINTS_PER_LIST))
+
+def index_signature(index_type: str, num_entries: int, dimension: int) -> str:
+    """Build parameters that make two indexes of the same vectors interchangeable"""
+    if index_type in ("hnsw", "hnsw_sq8"):
+        return f"{index_type}-m{HNSW_M}"
+    if index_type == "ivf_flat":
+        return f"ivf_flat-n{default_nlist(num_entries)}"
+    if index_type == "ivf_pq":
+        return f"ivf_pq-n{default_nlist(num_entries)}-m{pq_subquantizers(dimension)}"
+    return index_type
+
+def pq_subquantizers(dimension: int) -> int:
+    """Largest sub-quantizer count <= PQ_M that divides the vector dimension"""
+    m = min(PQ_M, dimension)
+    while dimension % m:
+        m -= 1
+    return m
+
+def create_index(index_type: str, dimension: int, num_entries: int):
+    """Empty inner-product index of the requested type"""
+    if index_type == "flat":
+        return faiss.IndexFlatIP(dimension)
+    if index_type == "hnsw":
+        return faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    if index_type == "sq8":
+        return faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+    if index_type == "hnsw_sq8":
+        return faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_8bit, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+
+    quantizer = faiss.IndexFlatIP(dimension)
+    nlist = default_nlist(num_entries)
+    if index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+    elif index_type == "ivf_pq":
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_subquantizers(dimension), 8,
+                                 faiss.METRIC_INNER_PRODUCT)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'")
+    return index
+
+def build_index(embeddings: np.ndarray, index_type: str):
+    """Train (if needed) and populate an index from a possibly memory-mapped matrix"""
+    num_entries, dimension = embeddings.shape
+    index = create_index(index_type, dimension, num_entries)
+
+    if requires_training(index_type):
+        sample_size = min(num_entries, MAX_TRAINING_SAMPLE)
+        rows = np.sort(np.random.default_rng(0).choice(num_entries, sample_size, replace=False))
+        started = time.time()
+        index.train(np.ascontiguousarray(embeddings[rows], dtype='float32'))
+        logger.info(f"Trained {index_type} index on {sample_size} vectors in {time.time() - started:.1f}s")
+
+    # Add in slices so a memory-mapped matrix is never copied whole
+    for start in range(0, num_entries, ADD_BATCH_SIZE):
+        index.add(np.ascontiguousarray(embeddings[start:start + ADD_BATCH_SIZE], dtype='float32'))
+
+    configure_search(index)
+    return index
+
+def configure_search(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Apply the recall/latency knobs of IVF (nprobe) and HNSW (efSearch) indexes"""
+    # The downcast view does not own the index, so hand back the original object
+    concrete = faiss.downcast_index(index)
+    if isinstance(concrete, faiss.IndexIVF):
+        concrete.nprobe = min(nprobe or NPROBE, concrete.nlist)
+    elif isinstance(concrete, faiss.IndexHNSW):
+        concrete.hnsw.efSearch = ef_search or EF_SEARCH
+    return index
+
+def enable_reconstruction(index):
+    """Let IVF indexes map ids back to stored vectors (flat, SQ and HNSW indexes always can)"""
+    concrete = faiss.downcast_index(index)
+    if isinstance(concrete, faiss.IndexIVF):
+        concrete.make_direct_map()
+    return index
+
+def filtered_search(index, queries: np.ndarray, k: int, rows: np.ndarray):
+    """Search only the given rows of an index, using a bitmap ID selector.
+
+    IVF and HNSW visit a fixed number of candidates, so with a selective
+    filter most of them would be rejected; nprobe and efSearch are scaled
+    up by the inverse of the allowed fraction to keep recall.
+    """
+    bitmap = np.zeros(index.ntotal, dtype=bool)
+    bitmap[rows] = True
+    # The selector only holds a pointer into bits, which stays referenced until we return
+    bits = np.packbits(bitmap, bitorder="little")
+    selector = faiss.IDSelectorBitmap(index.ntotal, faiss.swig_ptr(bits))
+    widen = index.ntotal / max(len(rows), 1)
+
+    concrete = faiss.downcast_index(index)
+    if isinstance(concrete, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector,
+                                           nprobe=min(int(concrete.nprobe * widen), concrete.nlist))
+    elif isinstance(concrete, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector,
+                                            efSearch=min(int(concrete.hnsw.efSearch * widen),
+                                                         max(MAX_FILTERED_EF_SEARCH, concrete.hnsw.efSearch)))
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(queries, k, params=params)
+
+def _timed_search(index, queries: np.ndarray, k: int):
+    """Search one query at a time, as /ask does, and collect per-query latency"""
+    latencies = []
+    all_indices = []
+    for query in queries:
+        started = time.perf_counter()
+        _, indices = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - started)
+        all_indices.append(indices[0])
+    return np.array(all_indices), np.array(latencies)
+
+def recall_latency_report(embeddings: np.ndarray, queries: np.ndarray, k: int = 10,
+                          index_types: Optional[List[str]] = None) -> List[Dict]:
+    """Recall@k, top-1 agreement, per-query latency and memory of each index type against exact flat search"""
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    reference = build_index(embeddings, "flat")
+    truth, flat_latencies = _timed_search(reference, queries, k)
+
+    report = [_report_row("flat", 1.0, 1.0, flat_latencies, reference)]
+    for index_type in [t for t in index_types or INDEX_TYPES if t != "flat"]:
+        resolved = resolve_index_type(index_type, embeddings.shape[0])
+        if resolved != index_type:
+            continue
+        candidate = build_index(embeddings, index_type)
+        found, latencies = _timed_search(candidate, queries, k)
+        hits = sum(len(set(row) & set(expected) - {-1}) for row, expected in zip(found, truth))
+        recall = hits / float(truth.size)
+        top1 = float(np.mean(found[:, 0] == truth[:, 0]))
+        report.append(_report_row(index_type, recall, top1, latencies, candidate))
+    return report
+
+def holdout_split(num_entries: int, holdout: int, seed: int = 0):
+    """Rows to index and rows whose vectors serve as unseen queries"""
+    held_out = np.sort(np.random.default_rng(seed).choice(num_entries, min(holdout, num_entries // 2),
+                                                          replace=False))
+    return np.setdiff1d(np.arange(num_entries), held_out, assume_unique=True), held_out
+
+def clustered_vectors(num_entries: int, dimension: int = 384, seed: int = 0) -> np.ndarray:
+    """Unit vectors standing in for question embeddings: entries on a topic, topics within a domain.
+
+    Questions on the same topic land at a cosine similarity around 0.6
+    (close to paraphrases under all-MiniLM-L6-v2), questions in the same
+    domain around 0.3, so the neighbours past the first few are graded
+    rather than all equally unrelated.
+    """
+    rng = np.random.default_rng(seed)
+    domains = rng.standard_normal((max(1, num_entries // 1000), dimension), dtype='float32')
+    topics = domains[rng.integers(len(domains), size=max(1, num_entries // 20))]
+    topics += rng.standard_normal(topics.shape, dtype='float32')
+    vectors = np.empty((num_entries, dimension), dtype='float32')
+    for start in range(0, num_entries, ADD_BATCH_SIZE):
+        count = min(ADD_BATCH_SIZE, num_entries - start)
+        chosen = topics[rng.integers(len(topics), size=count)]
+        vectors[start:start + count] = chosen + 1.1 * rng.standard_normal((count, dimension), dtype='float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+def _report_row(index_type: str, recall: float, top1: float, latencies: np.ndarray, index) -> Dict:
+    return {
+        "index_type": index_type,
+        "recall_at_k": round(recall, 4),
+        "top1_agreement": round(top1, 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "index_mb": round(faiss.serialize_index(index).nbytes / 2**20, 2)
+    }
+
+if __name__ == "__main__":
+    # Usage: python -m app.services.ann_index [corpus.jsonl] [index_type ...]
+    #        python -m app.services.ann_index --synthetic NUM_ENTRIES [index_type ...]
+    # Questions of 200 held-out entries are searched against indexes built
+    # without them, so the exact match is never in the index. --synthetic
+    # uses clustered_vectors() instead of a corpus, for sizes beyond it.
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) > 2 and sys.argv[1] == "--synthetic":
+        vectors = clustered_vectors(int(sys.argv[2]))
+        base_rows, held_out = holdout_split(len(vectors), 200)
+        query_vectors, indexed = vectors[held_out], vectors[base_rows]
+        index_types = sys.argv[3:]
+    else:
+        from .knowledge_base import AgricultureKnowledgeBase
+        kb = AgricultureKnowledgeBase(corpus_path=sys.argv[1] if len(sys.argv) > 1 else None)
+        base_rows, held_out = holdout_split(len(kb.knowledge_base), 200)
+        query_vectors = kb.embedder.encode([kb.knowledge_base[row]['question'] for row in held_out])
+        indexed = kb.stored_vectors(base_rows)
+        index_types = sys.argv[2:]
+    for row in recall_latency_report(indexed, query_vectors, k=10, index_types=index_types or None):
+        print(row)
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# A circuit opens once CIRCUIT_ERROR_RATE of its last CIRCUIT_WINDOW calls failed (after at least
+# CIRCUIT_MIN_CALLS), or after CIRCUIT_TIMEOUT_LIMIT timeouts in a row
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "20"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_TIMEOUT_LIMIT = int(os.getenv("CIRCUIT_TIMEOUT_LIMIT", "2"))
+# Seconds an open circuit waits before it is probed; doubled after each failed probe, up to the max
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", "300"))
+# How often the background loop looks for circuits due a probe
+CIRCUIT_PROBE_INTERVAL = 5.0
+CIRCUIT_PROBE_TIMEOUT = 10.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+Probe = Callable[[], Awaitable[bool]]
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one backend or model.
+
+    An open circuit rejects calls until its open period has passed. Then it
+    is probed: by its probe function from the background loop when it has
+    one, otherwise by letting a single live call through (half-open). A
+    successful probe closes the circuit, a failed one reopens it for twice
+    as long.
+    """
+    def __init__(self, name: str, probe: Optional[Probe] = None):
+        self.name = name
+        self.probe = probe
+        self.state = CLOSED
+        self.failures: Deque[bool] = deque(maxlen=CIRCUIT_WINDOW)
+        self.consecutive_timeouts = 0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.opened_at: Optional[float] = None
+        self.trial_started_at: Optional[float] = None
+        self.trips = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    def available(self) -> bool:
+        """Whether a call could go through now (no side effects, unlike allow())"""
+        if self.state == CLOSED:
+            return True
+        if self.probe is not None:
+            return False
+        return time.monotonic() >= self._retry_at()
+
+    def allow(self) -> bool:
+        """Whether to make a call; a circuit without a probe lets one trial call through once due"""
+        if self.state == CLOSED:
+            return True
+        if self.probe is None and time.monotonic() >= self._retry_at():
+            # A trial that never reported back (e.g. cancelled) expires after another open period
+            self.state = HALF_OPEN
+            self.trial_started_at = time.monotonic()
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+            self._close()
+        self.failures.append(False)
+        self.consecutive_timeouts = 0
+
+    def record_failure(self, error: Union[Exception, str]):
+        self.last_error = str(error) or type(error).__name__
+        if self.state == HALF_OPEN:
+            self._reopen()
+            return
+        if self.state == OPEN:
+            return
+        self.failures.append(True)
+        if isinstance(error, asyncio.TimeoutError):
+            self.consecutive_timeouts += 1
+        else:
+            self.consecutive_timeouts = 0
+        if self.consecutive_timeouts >= CIRCUIT_TIMEOUT_LIMIT or (
+                len(self.failures) >= CIRCUIT_MIN_CALLS and self.error_rate() >= CIRCUIT_ERROR_RATE):
+            self._trip()
+
+    def error_rate(self) -> float:
+        return sum(self.failures) / len(self.failures) if self.failures else 0.0
+
+    def probe_due(self) -> bool:
+        return self.state == OPEN and self.probe is not None and time.monotonic() >= self._retry_at()
+
+    async def run_probe(self):
+        self.state = HALF_OPEN
+        self.trial_started_at = time.monotonic()
+        try:
+            healthy = await asyncio.wait_for(self.probe(), timeout=CIRCUIT_PROBE_TIMEOUT)
+        except Exception as e:
+            healthy = False
+            self.last_error = str(e) or type(e).__name__
+        if healthy:
+            self.record_success()
+        else:
+            self._reopen()
+
+    def _retry_at(self) -> float:
+        started = self.trial_started_at if self.state == HALF_OPEN else self.opened_at
+        return started + self.open_seconds
+
+    def _trip(self):
+        self.trips += 1
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(f"Circuit {self.name} opened for {self.open_seconds:.0f}s: "
+                       f"error rate {self.error_rate():.0%}, {self.consecutive_timeouts} timeouts in a row, "
+                       f"last error: {self.last_error}")
+
+    def _reopen(self):
+        self.open_seconds = min(self.open_seconds * 2, CIRCUIT_MAX_OPEN_SECONDS)
+        self.trial_started_at = None
+        self._trip()
+
+    def _close(self):
+        self.state = CLOSED
+        self.failures.clear()
+        self.consecutive_timeouts = 0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.opened_at = None
+        self.trial_started_at = None
+
+    def stats(self) -> Dict:
+        retry_in = None
+        if self.state != CLOSED:
+            retry_in = round(max(0.0, self._retry_at() - time.monotonic()), 1)
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 3),
+            "calls": len(self.failures),
+            "consecutive_timeouts": self.consecutive_timeouts,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in": retry_in,
+            "background_probe": self.probe is not None,
+            "last_error": self.last_error
+        }
+
+class CircuitBreakerRegistry:
+    """Circuit breakers by name ("ollama", "ollama:<model>", "hf:<model>", ...), shared by the clients.
+
+    start() runs the background loop that probes open circuits which have a
+    probe function, so requests never wait on a probe.
+    """
+    def __init__(self):
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._probe_task: Optional[asyncio.Task] = None
+
+    def get(self, name: str, probe: Optional[Probe] = None) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = CircuitBreaker(name, probe)
+        elif probe is not None:
+            breaker.probe = probe
+        return breaker
+
+    def available(self, *names: str) -> bool:
+        return all(self.get(name).available() for name in names)
+
+    def allow(self, *names: str) -> bool:
+        return all(self.get(name).allow() for name in names)
+
+    def start(self, interval: float = CIRCUIT_PROBE_INTERVAL):
+        if self._probe_task is None:
+            self._probe_task = asyncio.create_task(self._probe_loop(interval))
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    async def _probe_loop(self, interval: float):
+        while True:
+            due = [breaker for breaker in self.breakers.values() if breaker.probe_due()]
+            if due:
+                await asyncio.gather(*(breaker.run_probe() for breaker in due))
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict:
+        return {name: breaker.stats() for name, breaker in sorted(self.breakers.items())}
@@ -0,0 +1,189 @@
+import asyncio
+import importlib
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Union
+from .memory import process_memory
+
+logger = logging.getLogger(__name__)
+
+class ServiceContainer:
+    """Process-wide services shared by every router of an app.
+
+    Started once from the app lifespan so each worker loads the embedder and
+    builds the search index exactly once, whichever router needs them. The
+    heavy modules (sentence-transformers, FAISS, the AI clients) are only
+    imported by start(), which load_in_background() runs off the event loop
+    so the app can answer probes while the model loads.
+    """
+    def __init__(self, orchestrator_cls: Union[type, str], index_dir: Optional[str] = None):
+        # A "module:Class" path defers importing the orchestrator (and everything it imports)
+        self.orchestrator_cls = orchestrator_cls
+        self.index_dir = index_dir
+        self.state = "starting"
+        self.load_error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._load_task: Optional[asyncio.Task] = None
+        self.knowledge_base = None
+        self.search_executor = None
+        self.searcher = None
+        self.orchestrator = None
+        self.sms_processor = None
+        self.http = None
+        self.update_status: Dict = {"state": "idle"}
+        self._update_lock: Optional[asyncio.Lock] = None
+        self._reload_task: Optional[asyncio.Task] = None
+
+    @property
+    def started(self) -> bool:
+        return self.orchestrator is not None
+
+    def load_in_background(self):
+        """Start loading without waiting for it; started flips to True once everything is ready"""
+        if self._load_task is None:
+            self._load_task = asyncio.create_task(self.start())
+            # Failures are reported through state and load_error
+            self._load_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def start(self):
+        """Create the shared knowledge base, orchestrator and SMS processor"""
+        if self.started:
+            return
+        self.state = "loading"
+        started_at = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            # Imports and model/index loading run on a thread; the event loop keeps serving
+            self.knowledge_base, orchestrator_cls = await loop.run_in_executor(None, self._load)
+            from .embedding_batcher import EmbeddingMicroBatcher, MAX_BATCH_SIZE
+            from .http_client import HTTPClientPool
+            from .search_executor import SearchExecutor
+            from .sms_service import SMSQueryProcessor
+
+            # Searches run on a dedicated pool; batching sits in front of it unless disabled
+            self.search_executor = SearchExecutor(self.knowledge_base)
+            if MAX_BATCH_SIZE > 1:
+                self.searcher = EmbeddingMicroBatcher(self.search_executor)
+            else:
+                self.searcher = self.search_executor
+            self._update_lock = asyncio.Lock()
+            # Every AI and translation client reuses the same pooled keep-alive connections
+            self.http = HTTPClientPool()
+            orchestrator = orchestrator_cls(self.knowledge_base, searcher=self.searcher, http=self.http)
+            if hasattr(orchestrator, "start"):
+                await orchestrator.start()
+            self.sms_processor = SMSQueryProcessor(orchestrator)
+            # Set last: started, and with it the routes that need the services, turns on here
+            self.orchestrator = orchestrator
+        except Exception as e:
+            self.state = "failed"
+            self.load_error = str(e)
+            logger.error(f"Service startup failed: {e}")
+            raise
+        self.load_seconds = round(time.time() - started_at, 2)
+        self.state = "ready"
+        logger.info(f"Services ready in {self.load_seconds}s")
+
+    def _load(self):
+        from .knowledge_base import AgricultureKnowledgeBase
+        orchestrator_cls = self.orchestrator_cls
+        if isinstance(orchestrator_cls, str):
+            module_name, _, class_name = orchestrator_cls.partition(":")
+            orchestrator_cls = getattr(importlib.import_module(module_name), class_name)
+        return AgricultureKnowledgeBase(index_dir=self.index_dir), orchestrator_cls
+
+    def readiness(self) -> Dict:
+        return {
+            "status": self.state,
+            "ready": self.started,
+            "load_seconds": self.load_seconds,
+            "error": self.load_error
+        }
+
+    async def reload_knowledge(self, corpus_path: Optional[str] = None) -> Dict:
+        """Rebuild the knowledge base from a corpus file in the background, then swap it in"""
+        self._reload_task = asyncio.create_task(
+            self._run_update("reload", lambda knowledge_base: knowledge_base.reload(corpus_path))
+        )
+        # Failures are reported through update_status
+        self._reload_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self.knowledge_status()
+
+    async def update_knowledge(self, add: Optional[List[Dict]] = None, remove_ids: Optional[List] = None) -> Dict:
+        """Add, replace or remove entries and swap in the resulting version"""
+        await self._run_update("update", lambda knowledge_base: knowledge_base.update_entries(add, remove_ids))
+        return self.knowledge_status()
+
+    def knowledge_status(self) -> Dict:
+        knowledge_base = self.knowledge_base
+        return {
+            "version": knowledge_base.index_version if knowledge_base else None,
+            "entries": len(knowledge_base.knowledge_base) if knowledge_base else 0,
+            "index_type": knowledge_base.index_type if knowledge_base else None,
+            "update": dict(self.update_status)
+        }
+
+    async def _run_update(self, kind: str, build: Callable):
+        # Updates run one at a time, each on top of the version the previous one produced
+        async with self._update_lock:
+            self.update_status = {"state": "building", "kind": kind, "started_at": time.time()}
+            loop = asyncio.get_running_loop()
+            previous = self.knowledge_base
+            try:
+                knowledge_base = await loop.run_in_executor(None, build, previous)
+                self._swap_knowledge_base(knowledge_base)
+            except Exception as e:
+                logger.error(f"Knowledge base {kind} failed: {e}")
+                self.update_status.update(state="failed", error=str(e), finished_at=time.time())
+                raise
+            # A replaced update version is deleted only once no search worker can still be mapping it
+            await self.search_executor.drain()
+            if previous.is_update_version and previous.index_version != knowledge_base.index_version:
+                previous.index_store.remove(previous.index_version)
+            self.update_status.update(state="ready", version=knowledge_base.index_version,
+                                      finished_at=time.time())
+
+    def _swap_knowledge_base(self, knowledge_base):
+        """Point every consumer at the new version; in-flight searches finish on the old one"""
+        self.search_executor.swap(knowledge_base)
+        self.orchestrator.knowledge_base = knowledge_base
+        self.knowledge_base = knowledge_base
+        logger.info(f"Serving knowledge base version {knowledge_base.index_version[:16]}")
+
+    async def stop(self):
+        for task in (self._load_task, self._reload_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if hasattr(self.orchestrator, "close"):
+            await self.orchestrator.close()
+        if hasattr(self.searcher, "close"):
+            await self.searcher.close()
+        if self.search_executor is not None:
+            self.search_executor.shutdown()
+        if self.http is not None:
+            await self.http.close()
+        self.sms_processor = None
+        self.orchestrator = None
+        self.searcher = None
+        self.search_executor = None
+        self.http = None
+        self.knowledge_base = None
+        self.state = "stopped"
+
+    def search_stats(self) -> Dict:
+        """Batching and search pool metrics (queue depth, latency)"""
+        return self.searcher.stats() if self.searcher else {}
+
+    def query_cache_stats(self) -> Optional[Dict]:
+        """Query cache metrics, or None in process mode, where each worker process caches its own searches"""
+        if self.search_executor is not None and self.search_executor.mode == "process":
+            return None
+        return self.knowledge_base.query_cache.stats() if self.knowledge_base else None
+
+    def memory_usage(self) -> Dict:
+        """Per-component memory report for this worker"""
+        return {
+            "process": process_memory(),
+            "knowledge_base": self.knowledge_base.memory_usage() if self.knowledge_base else {},
+            "orchestrator": type(self.orchestrator).__name__ if self.orchestrator else None
+        }
@@ -0,0 +1,118 @@
+import csv
+import json
+import logging
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def detect_language(text: str) -> str:
+    """Hindi if the text contains Devanagari characters, English otherwise"""
+    return 'hi' if any('\u0900' <= char <= '\u097F' for char in text) else 'en'
+
+def normalize_entry(raw: Dict) -> Optional[Dict]:
+    """Coerce a raw corpus record into the knowledge base entry schema.
+
+    Returns None for records without a question or an answer.
+    """
+    question = str(raw.get("question") or "").strip()
+    answer = str(raw.get("answer") or "").strip()
+    if not question or not answer:
+        return None
+
+    keywords = raw.get("keywords") or []
+    if isinstance(keywords, str):
+        # CSV cells hold keywords as "wheat|fertilizer" or "wheat, fertilizer"
+        separator = "|" if "|" in keywords else ","
+        keywords = [keyword.strip() for keyword in keywords.split(separator)]
+    keywords = [str(keyword) for keyword in keywords if str(keyword).strip()]
+
+    entry = {
+        "question": question,
+        "answer": answer,
+        "keywords": keywords,
+        "category": str(raw.get("category") or "general_farming").strip(),
+        "crop": str(raw.get("crop") or "general").strip(),
+        "language": str(raw.get("language") or detect_language(question)).strip()
+    }
+    if isinstance(raw.get("id"), (int, float, str)) and raw["id"] != "":
+        entry["id"] = raw["id"]
+    return entry
+
+def iter_corpus_records(path: str) -> Iterator[Dict]:
+    """Stream raw records from a JSONL or CSV corpus file, one at a time"""
+    extension = os.path.splitext(path)[1].lower()
+
+    with open(path, encoding="utf-8", newline="") as f:
+        if extension == ".csv":
+            yield from csv.DictReader(f)
+        elif extension in (".jsonl", ".ndjson"):
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"{path}:{line_number}: skipping invalid JSON ({e})")
+                    continue
+                if not isinstance(record, dict):
+                    logger.warning(f"{path}:{line_number}: skipping {type(record).__name__} record (expected an object)")
+                    continue
+                yield record
+        else:
+            raise ValueError(f"Unsupported corpus format '{extension}' (expected .jsonl or .csv)")
+
+def iter_corpus_entries(path: str, reserved_ids: Iterable = (), first_id: Optional[int] = None) -> Iterator[Dict]:
+    """Stream normalized entries, skipping records that do not fit the schema.
+
+    Records whose id is in reserved_ids (e.g. the built-in entries) or was
+    used by an earlier record are skipped too, since search results are
+    deduplicated by id and one of the two entries would never be served.
+    With first_id, records without an id get one counting up from it,
+    past every id the corpus sets explicitly (found in a first pass).
+    """
+    taken = set(reserved_ids)
+    assigned = set(taken)
+    if first_id is not None:
+        assigned.update(entry["id"] for entry in map(normalize_entry, iter_corpus_records(path))
+                        if entry is not None and "id" in entry)
+    next_id = first_id
+    skipped = 0
+    duplicates = 0
+    for record in iter_corpus_records(path):
+        entry = normalize_entry(record)
+        if entry is None:
+            skipped += 1
+            continue
+        if "id" in entry:
+            if entry["id"] in taken:
+                duplicates += 1
+                continue
+            taken.add(entry["id"])
+        elif next_id is not None:
+            while next_id in assigned:
+                next_id += 1
+            entry["id"] = next_id
+            next_id += 1
+        yield entry
+    if skipped:
+        logger.warning(f"{path}: skipped {skipped} records without a question or answer")
+    if duplicates:
+        logger.warning(f"{path}: skipped {duplicates} records whose id is already taken")
+
+def iter_corpus_chunks(path: str, chunk_size: int, reserved_ids: Iterable = (),
+                       first_id: Optional[int] = None) -> Iterator[List[Dict]]:
+    """Stream normalized entries in lists of at most chunk_size"""
+    chunk = []
+    for entry in iter_corpus_entries(path, reserved_ids, first_id):
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def count_corpus_entries(path: str, reserved_ids: Iterable = ()) -> int:
+    """Number of valid entries in a corpus, without holding them in memory"""
+    return sum(1 for _ in iter_corpus_entries(path, reserved_ids))
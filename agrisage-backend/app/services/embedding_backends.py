@@ -0,0 +1,330 @@
+import inspect
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .memory import model_nbytes
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BACKENDS = ("torch", "torch_int8", "onnx", "onnx_int8")
+EMBEDDER_BACKEND = os.getenv("KB_EMBEDDER_BACKEND", "torch")
+# Exported ONNX models are cached here (the persistent disk on Render)
+EMBEDDER_CACHE_DIR = os.getenv("KB_EMBEDDER_CACHE_DIR", "/data/embedder")
+ONNX_THREADS = int(os.getenv("KB_ONNX_THREADS", "0"))  # 0 = ONNX Runtime default
+
+# Lowest parity with the torch vectors the __main__ check accepts for a backend
+PARITY_MIN_COSINE = float(os.getenv("KB_PARITY_MIN_COSINE", "0.98"))
+PARITY_MIN_TOP1 = float(os.getenv("KB_PARITY_MIN_TOP1", "0.95"))
+
+EXPORT_CONFIG_FILE = "export.json"
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model-int8.onnx"
+
+class TorchBackend:
+    """Reference backend: the sentence-transformers model in PyTorch"""
+    name = "torch"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype="float32")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def nbytes(self) -> int:
+        return model_nbytes(self.model)
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch model with its Linear layers dynamically quantized to int8"""
+    name = "torch_int8"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        import torch
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def nbytes(self) -> int:
+        # Packed int8 weights are not exposed as parameters; measure the serialized state instead
+        import torch
+        buffer = io.BytesIO()
+        torch.save(self.model.state_dict(), buffer)
+        return buffer.tell()
+
+class OnnxBackend:
+    """The transformer exported to ONNX and run with ONNX Runtime.
+
+    Tokenization uses the fast tokenizer saved with the export, and pooling
+    and normalization are redone in numpy, so vectors match the PyTorch
+    model's and the existing index stays valid. The export happens once
+    and is cached under KB_EMBEDDER_CACHE_DIR.
+    """
+    name = "onnx"
+    model_file = ONNX_MODEL_FILE
+
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDER_CACHE_DIR):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        model_dir = ensure_onnx_export(model_name, cache_dir)
+        self.model_path = os.path.join(model_dir, self.model_file)
+        if not os.path.exists(self.model_path):
+            quantize_onnx_model(os.path.join(model_dir, ONNX_MODEL_FILE), self.model_path)
+
+        with open(os.path.join(model_dir, EXPORT_CONFIG_FILE), encoding="utf-8") as f:
+            self.config = json.load(f)
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.config["max_seq_length"])
+        self.tokenizer.enable_padding(pad_id=self.config["pad_token_id"], pad_token=self.config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        if ONNX_THREADS:
+            options.intra_op_num_threads = ONNX_THREADS
+        self.session = onnxruntime.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            encodings = self.tokenizer.encode_batch(list(texts[start:start + batch_size]))
+            inputs = {
+                "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+                "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+                "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64)
+            }
+            hidden = self.session.run(None, {name: inputs[name] for name in self.input_names})[0]
+            batches.append(self._pool(hidden, inputs["attention_mask"]))
+        if not batches:
+            return np.empty((0, self.get_sentence_embedding_dimension()), dtype="float32")
+        return np.vstack(batches).astype("float32")
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.config["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.config["dimension"]
+
+    def nbytes(self) -> int:
+        return os.path.getsize(self.model_path)
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """ONNX export with int8 dynamically quantized weights"""
+    name = "onnx_int8"
+    model_file = ONNX_INT8_MODEL_FILE
+
+BACKEND_CLASSES = {
+    "torch": TorchBackend,
+    "torch_int8": QuantizedTorchBackend,
+    "onnx": OnnxBackend,
+    "onnx_int8": QuantizedOnnxBackend
+}
+
+def create_embedder(model_name: str, backend: str = EMBEDDER_BACKEND):
+    """Embedding backend by name; falls back to PyTorch if an optimized backend cannot load"""
+    if backend not in BACKEND_CLASSES:
+        raise ValueError(f"Unknown embedder backend '{backend}' (expected one of {', '.join(EMBEDDING_BACKENDS)})")
+    started = time.time()
+    try:
+        embedder = BACKEND_CLASSES[backend](model_name)
+    except (ImportError, OSError, RuntimeError, ValueError) as e:
+        if backend == "torch":
+            raise
+        logger.warning(f"Embedder backend {backend} unavailable ({e}); using torch")
+        return create_embedder(model_name, "torch")
+    logger.info(f"Loaded {model_name} with the {backend} backend in {time.time() - started:.1f}s")
+    return embedder
+
+def embedder_identity(model_name: str, embedder) -> str:
+    """Model name plus the backend that actually loaded (after any fallback to torch).
+
+    Backends produce close but not identical vectors, so index versions
+    differ per backend; torch keeps the bare model name its artifacts
+    were stored under.
+    """
+    backend = getattr(embedder, "name", "torch")
+    return model_name if backend == "torch" else f"{model_name}+{backend}"
+
+def export_path(model_name: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+
+def ensure_onnx_export(model_name: str, cache_dir: str = EMBEDDER_CACHE_DIR) -> str:
+    """Directory holding the ONNX export of a sentence-transformers model, exporting it if missing"""
+    model_dir = export_path(model_name, cache_dir)
+    if os.path.exists(os.path.join(model_dir, EXPORT_CONFIG_FILE)):
+        return model_dir
+
+    tmp_dir = f"{model_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    try:
+        export_onnx(model_name, tmp_dir)
+        try:
+            os.rename(tmp_dir, model_dir)
+        except OSError:
+            # Another worker finished the same export first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return model_dir
+
+def export_onnx(model_name: str, output_dir: str, opset: int = 14):
+    """Export the transformer of a sentence-transformers model plus what is needed to pool its output"""
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0]
+    pooling = next((module for module in model if isinstance(module, models.Pooling)), None)
+    pooling_mode = _pooling_mode(pooling.get_config_dict()) if pooling is not None else None
+    if pooling_mode not in ("mean", "cls"):
+        raise ValueError(f"{model_name} uses a pooling mode the ONNX backend does not implement")
+    tokenizer = transformer.tokenizer
+    if not tokenizer.is_fast:
+        raise ValueError(f"{model_name} has no fast tokenizer to run without transformers")
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["How much urea for wheat?"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    # Recent torch defaults to the dynamo exporter; the TorchScript one needs no extra packages
+    options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    class TokenEmbeddings(torch.nn.Module):
+        # Keyword arguments keep the export independent of the model's forward() argument order
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, *inputs):
+            return self.auto_model(**dict(zip(input_names, inputs)))[0]
+
+    with torch.no_grad():
+        torch.onnx.export(TokenEmbeddings(transformer.auto_model).eval(), tuple(sample[name] for name in input_names),
+                          os.path.join(output_dir, ONNX_MODEL_FILE), input_names=input_names,
+                          output_names=["last_hidden_state"], dynamic_axes=dynamic_axes,
+                          opset_version=opset, **options)
+
+    config = {
+        "model": model_name,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pooling": pooling_mode,
+        "normalize": any(isinstance(module, models.Normalize) for module in model),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id
+    }
+    with open(os.path.join(output_dir, EXPORT_CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+def _pooling_mode(config: Dict) -> Optional[str]:
+    # sentence-transformers 2.x/3.x use one flag per mode, later versions a single pooling_mode
+    if "pooling_mode" in config:
+        return config["pooling_mode"]
+    if config.get("pooling_mode_mean_tokens"):
+        return "mean"
+    if config.get("pooling_mode_cls_token"):
+        return "cls"
+    return None
+
+def quantize_onnx_model(source_path: str, target_path: str):
+    """int8 dynamic quantization of an exported model's weights"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    tmp_path = f"{target_path}.tmp-{os.getpid()}"
+    quantize_dynamic(source_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, target_path)
+
+def parity_report(candidate, reference, texts: List[str], batch_size: int = 32) -> Dict:
+    """How closely a backend reproduces the reference vectors.
+
+    Besides per-text cosine similarity, half of the texts are searched (with
+    the candidate's vectors) against the other half encoded by the reference,
+    i.e. against an index built the current way; top1_agreement is the share
+    of those searches returning the same entry as the reference would.
+    """
+    expected = reference.encode(texts, batch_size=batch_size)
+    actual = candidate.encode(texts, batch_size=batch_size)
+    cosine = np.sum(expected * actual, axis=1) / np.clip(
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1), 1e-12, None)
+
+    documents, queries = expected[0::2], slice(1, None, 2)
+    reference_top1 = np.argmax(expected[queries] @ documents.T, axis=1)
+    candidate_top1 = np.argmax(actual[queries] @ documents.T, axis=1)
+    return {
+        "backend": candidate.name,
+        "texts": len(texts),
+        "min_cosine": round(float(cosine.min()), 5),
+        "mean_cosine": round(float(cosine.mean()), 5),
+        "top1_agreement": round(float(np.mean(reference_top1 == candidate_top1)), 4)
+    }
+
+def latency_report(backend, texts: List[str], batch_size: int = 32) -> Dict:
+    """Single-query latency (as /ask encodes) and batched throughput of a backend"""
+    backend.encode(texts[:1])  # warm-up
+    latencies = []
+    for text in texts:
+        started = time.perf_counter()
+        backend.encode([text])
+        latencies.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    backend.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    return {
+        "backend": backend.name,
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "batch_texts_per_s": round(len(texts) / elapsed, 1),
+        "model_mb": round(backend.nbytes() / 2**20, 1)
+    }
+
+if __name__ == "__main__":
+    # Usage: python -m app.services.embedding_backends [corpus.jsonl] [backend ...]
+    # Compares every backend with the PyTorch reference on corpus questions;
+    # exits with status 1 if one falls below PARITY_MIN_COSINE / PARITY_MIN_TOP1.
+    import sys
+    from .corpus_loader import iter_corpus_entries
+    from .knowledge_base import EMBEDDER_MODEL
+
+    logging.basicConfig(level=logging.INFO)
+    corpus = sys.argv[1] if len(sys.argv) > 1 else ""
+    if corpus:
+        sample_texts = [entry["question"] for _, entry in zip(range(512), iter_corpus_entries(corpus))]
+    else:
+        sample_texts = ["What fertilizer for wheat?", "Best time to sow rice?", "Tomato leaf curl treatment",
+                        "PM-KISAN scheme benefits", "धान में पीली पत्तियां", "गेहूं के लिए खाद", "Cotton pink bollworm control",
+                        "How much water does sugarcane need?"] * 8
+
+    started = time.time()
+    reference_backend = TorchBackend(EMBEDDER_MODEL)
+    print({"backend": "torch", "load_s": round(time.time() - started, 2)})
+    print(latency_report(reference_backend, sample_texts))
+    failed = []
+    for backend_name in sys.argv[2:] or [name for name in EMBEDDING_BACKENDS if name != "torch"]:
+        started = time.time()
+        backend = BACKEND_CLASSES[backend_name](EMBEDDER_MODEL)
+        print({"backend": backend_name, "load_s": round(time.time() - started, 2)})
+        parity = parity_report(backend, reference_backend, sample_texts)
+        print(parity)
+        print(latency_report(backend, sample_texts))
+        if parity["min_cosine"] < PARITY_MIN_COSINE or parity["top1_agreement"] < PARITY_MIN_TOP1:
+            failed.append(backend_name)
+    if failed:
+        print(f"Parity below min_cosine {PARITY_MIN_COSINE} / top1_agreement {PARITY_MIN_TOP1}: {', '.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = int(os.getenv("KB_BATCH_MAX_SIZE", "32"))
+MAX_WAIT_MS = float(os.getenv("KB_BATCH_MAX_WAIT_MS", "5"))
+
+class EmbeddingMicroBatcher:
+    """Coalesces concurrent knowledge base searches into batched forward passes.
+
+    Queries arriving within max_wait_ms of each other (up to max_batch_size)
+    are encoded together and searched with a single index.search call on the
+    search executor's pool; each caller gets back exactly what
+    search_knowledge would have returned.
+    """
+    def __init__(self, search_executor, max_batch_size: int = MAX_BATCH_SIZE,
+                 max_wait_ms: float = MAX_WAIT_MS):
+        self.search_executor = search_executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._dispatches = set()
+        self.batches = 0
+        self.queries = 0
+
+    async def search(self, query: str, top_k: int = 3,
+                     filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """Queue a query for the next batch and wait for its results"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((query, top_k, filters, future))
+        return await future
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for task in list(self._dispatches):
+            task.cancel()
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "queries": self.queries,
+            "avg_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "executor": self.search_executor.stats()
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        # One batch in flight per pool worker; while they are all busy, new
+        # queries keep accumulating so the next batch is larger
+        slots = asyncio.Semaphore(self.search_executor.workers)
+        batch = []
+        try:
+            while True:
+                await slots.acquire()
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Callers that gave up while waiting do not need a forward pass
+                batch = [item for item in batch if not item[3].done()]
+                if not batch:
+                    slots.release()
+                    continue
+                task = asyncio.create_task(self._dispatch(batch, slots))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+                batch = []
+        except asyncio.CancelledError:
+            self._fail(batch + self._drain(), RuntimeError("Knowledge search batcher closed"))
+            raise
+        except Exception as e:
+            # Nobody awaits this task, so the queued callers are the ones to hear about it
+            logger.error(f"Knowledge search batcher failed, restarting it: {e}")
+            self._fail(batch + self._drain(), e)
+            self._worker = asyncio.create_task(self._run())
+
+    def _drain(self) -> list:
+        items = []
+        while self._queue is not None and not self._queue.empty():
+            items.append(self._queue.get_nowait())
+        return items
+
+    @staticmethod
+    def _fail(items, error: Exception):
+        for _, _, _, future in items:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _dispatch(self, batch, slots: asyncio.Semaphore):
+        # A search call takes one set of filters, so split the batch by partition
+        groups: Dict[tuple, list] = {}
+        for item in batch:
+            filters = item[2] or {}
+            groups.setdefault(tuple(sorted(filters.items())), []).append(item)
+
+        try:
+            for group in groups.values():
+                await self._search_group(group)
+        except asyncio.CancelledError:
+            self._fail(batch, RuntimeError("Knowledge search batcher closed"))
+            raise
+        finally:
+            slots.release()
+
+    async def _search_group(self, group):
+        queries = [query for query, _, _, _ in group]
+        top_k = max(k for _, k, _, _ in group)
+        try:
+            results = await self.search_executor.search_batch(queries, top_k, group[0][2])
+        except Exception as e:
+            logger.error(f"Batched knowledge search failed: {e}")
+            self._fail(group, e)
+            return
+
+        self.batches += 1
+        self.queries += len(group)
+        for (_, k, _, future), result in zip(group, results):
+            # Results are sorted by confidence, so a shorter list is a prefix
+            if not future.done():
+                future.set_result(result[:k])
@@ -1,18 +1,44 @@
 import os
+import time
 import requests
 import asyncio
 import aiohttp
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from .knowledge_base import AgricultureKnowledgeBase
+from .http_client import HTTPClientPool, default_pool
+from .streaming import done_event, iter_ndjson, result_events, token_event
+from .hedging import HedgedRunner
+from .circuit_breaker import CircuitBreakerRegistry
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .translation_store import TranslationStore
+from .translation_cache import BatchingTranslator
+from .single_flight import SINGLE_FLIGHT_TIMEOUT, SingleFlight
+from .query_cache import normalize_query
+
+# Model tiers in priority order, by their hedged runner and response cache names
+MODEL_TIERS = ["groq", "ollama", "hugging_face"]
+
+# Seconds between background refreshes of the installed Ollama models
+OLLAMA_INVENTORY_INTERVAL = float(os.getenv("OLLAMA_INVENTORY_INTERVAL", "60"))
+
+# Hugging Face statuses that concern the whole API (auth, rate limit) rather than one model
+API_WIDE_STATUSES = (401, 403, 429)
 
 class GroqClient:
     """Groq - FREE extremely fast LLM API"""
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None,
+                 breakers: Optional[CircuitBreakerRegistry] = None):
+        self.http = http or default_pool()
+        self.breakers = breakers or CircuitBreakerRegistry()
         self.api_key = os.getenv("GROQ_API_KEY")  # FREE at console.groq.com
         self.base_url = "https://api.groq.com/openai/v1"
     
     async def agricultural_chat(self, question: str, language: str = "en") -> Dict:
         """FREE ultra-fast LLM responses"""
+        circuit = self.breakers.get("groq")
+        if not circuit.allow():
+            return {"success": False, "error": "Groq circuit open"}
         try:
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -34,29 +60,47 @@ class GroqClient:
                 "temperature": 0.7
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.base_url}/chat/completions", 
-                                      headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return {
-                            "success": True,
-                            "response": result["choices"][0]["message"]["content"],
-                            "model": "Groq Llama3-8B (FREE)",
-                            "speed": "Ultra-fast"
-                        }
-                    else:
-                        return {"success": False, "error": f"Groq API Error: {response.status}"}
+            async with self.http.session.post(f"{self.base_url}/chat/completions",
+                                              headers=headers, json=payload) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    circuit.record_success()
+                    return {
+                        "success": True,
+                        "response": result["choices"][0]["message"]["content"],
+                        "model": "Groq Llama3-8B (FREE)",
+                        "speed": "Ultra-fast"
+                    }
+                else:
+                    circuit.record_failure(f"HTTP {response.status}")
+                    return {"success": False, "error": f"Groq API Error: {response.status}"}
                         
         except Exception as e:
+            circuit.record_failure(e)
             return {"success": False, "error": str(e)}
 
 class HuggingFaceFreeClient:
     """Hugging Face FREE Inference API"""
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None,
+                 breakers: Optional[CircuitBreakerRegistry] = None):
+        self.http = http or default_pool()
+        # "hugging_face" trips on rate limits, auth and connection failures and is probed via whoami;
+        # "hf:<model>" trips on a failing model
+        self.breakers = breakers or CircuitBreakerRegistry()
+        self.breakers.get("hugging_face", probe=self._probe_api)
         self.api_key = os.getenv("HUGGINGFACE_API_KEY")  # FREE at huggingface.co
         self.base_url = "https://api-inference.huggingface.co/models"
     
+    async def _probe_api(self) -> bool:
+        # Checks the token and rate limit without spending an inference request
+        try:
+            async with self.http.session.get("https://huggingface.co/api/whoami-v2",
+                                             headers={"Authorization": f"Bearer {self.api_key}"},
+                                             timeout=aiohttp.ClientTimeout(total=5)) as response:
+                return response.status == 200
+        except Exception:
+            return False
+    
     async def query_free_models(self, question: str) -> Dict:
         """Query multiple FREE agricultural models"""
         
@@ -69,7 +113,11 @@ class HuggingFaceFreeClient:
         
         headers = {"Authorization": f"Bearer {self.api_key}"}
         
+        api = self.breakers.get("hugging_face")
         for model in free_models:
+            circuit = self.breakers.get(f"hf:{model}")
+            if not self.breakers.allow("hugging_face", f"hf:{model}"):
+                continue
             try:
                 url = f"{self.base_url}/{model}"
                 payload = {
@@ -77,163 +125,482 @@ class HuggingFaceFreeClient:
                     "parameters": {"max_new_tokens": 150, "temperature": 0.7}
                 }
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=headers, json=payload) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            if result and not isinstance(result, dict) or not result.get('error'):
-                                return {
-                                    "success": True,
-                                    "response": result[0]["generated_text"] if isinstance(result, list) else str(result),
-                                    "model": f"HF-{model.split('/')[-1]} (FREE)",
-                                    "cost": "FREE"
-                                }
+                async with self.http.session.post(url, headers=headers, json=payload) as response:
+                    if response.status in API_WIDE_STATUSES:
+                        api.record_failure(f"HTTP {response.status}")
+                    elif response.status != 200:
+                        circuit.record_failure(f"HTTP {response.status}")
+                    else:
+                        api.record_success()
+                        circuit.record_success()
+                        result = await response.json()
+                        if result and not isinstance(result, dict) or not result.get('error'):
+                            return {
+                                "success": True,
+                                "response": result[0]["generated_text"] if isinstance(result, list) else str(result),
+                                "model": f"HF-{model.split('/')[-1]} (FREE)",
+                                "cost": "FREE"
+                            }
             except Exception as e:
+                if isinstance(e, aiohttp.ClientConnectorError):
+                    api.record_failure(e)
+                else:
+                    circuit.record_failure(e)
                 continue
         
         return {"success": False, "error": "All HF free models unavailable"}
 
 class OllamaLocalClient:
     """Ollama - FREE local models"""
-    def __init__(self):
+    request_timeout = 30.0
+    
+    def __init__(self, http: Optional[HTTPClientPool] = None,
+                 breakers: Optional[CircuitBreakerRegistry] = None):
+        self.http = http or default_pool()
+        # "ollama" trips when the server is unreachable and is probed via /api/tags;
+        # "ollama:<model>" trips when a model keeps failing or timing out
+        self.breakers = breakers or CircuitBreakerRegistry()
+        self.breakers.get("ollama", probe=self._probe_server)
         self.base_url = "http://localhost:11434"  # Local Ollama instance
+        # Try common free models
+        self.models = ["llama3.2:1b", "phi3:mini", "qwen2.5:0.5b"]
+        # Installed models from /api/tags; None until the first inventory
+        self.installed_models: Optional[List[str]] = None
+        self.inventory_checked_at: Optional[float] = None
+        self.inventory_error: Optional[str] = None
+        self._inventory_lock: Optional[asyncio.Lock] = None
+        self._refresh_now: Optional[asyncio.Event] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    async def refresh_inventory(self) -> List[str]:
+        """Fetch the installed models from Ollama (none when it is not running)"""
+        try:
+            async with self.http.session.get(f"{self.base_url}/api/tags",
+                                             timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"Ollama /api/tags returned {response.status}")
+                models_data = await response.json()
+            self.installed_models = [m['name'] for m in models_data.get('models', [])]
+            self.inventory_error = None
+        except Exception as e:
+            self.installed_models = []
+            self.inventory_error = str(e)
+        self.inventory_checked_at = time.time()
+        return self.installed_models
+    
+    async def _probe_server(self) -> bool:
+        await self.refresh_inventory()
+        return self.inventory_error is None
+    
+    def start_inventory_refresh(self, interval: float = OLLAMA_INVENTORY_INTERVAL):
+        """Keep the inventory fresh in the background instead of asking Ollama on every request"""
+        if self._refresh_task is None:
+            self._refresh_now = asyncio.Event()
+            self._refresh_task = asyncio.create_task(self._refresh_loop(interval))
+    
+    async def stop_inventory_refresh(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+    
+    async def _refresh_loop(self, interval: float):
+        while True:
+            await self.refresh_inventory()
+            try:
+                await asyncio.wait_for(self._refresh_now.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_now.clear()
+    
+    def invalidate_inventory(self):
+        """Re-check the installed models right away, e.g. after a model failed"""
+        if self._refresh_task is not None:
+            self._refresh_now.set()
+        else:
+            self.installed_models = None
+    
+    async def available_models(self) -> List[str]:
+        """Installed models out of self.models, in preference order"""
+        if self.installed_models is None:
+            if self._inventory_lock is None:
+                self._inventory_lock = asyncio.Lock()
+            # Concurrent first requests share one /api/tags call
+            async with self._inventory_lock:
+                if self.installed_models is None:
+                    await self.refresh_inventory()
+        return [model for model in self.models if model in self.installed_models]
+    
+    def inventory(self) -> Dict:
+        """Which of the models are installed, as of the last inventory"""
+        installed = self.installed_models or []
+        return {
+            "base_url": self.base_url,
+            "preferred_models": self.models,
+            "available_models": [model for model in self.models if model in installed],
+            "installed_models": installed,
+            "checked_at": self.inventory_checked_at,
+            "error": self.inventory_error,
+            "refresh_interval": OLLAMA_INVENTORY_INTERVAL if self._refresh_task is not None else None
+        }
+    
+    def _record_success(self, model: str):
+        self.breakers.get("ollama").record_success()
+        self.breakers.get(f"ollama:{model}").record_success()
+    
+    def _record_failure(self, model: str, error):
+        if isinstance(error, aiohttp.ClientConnectorError):
+            self.breakers.get("ollama").record_failure(error)
+        else:
+            self.breakers.get(f"ollama:{model}").record_failure(error)
+    
+    def _generation_payload(self, model: str, question: str, stream: bool = False) -> Dict:
+        return {
+            "model": model,
+            "prompt": f"You are an agricultural expert. Answer this farming question concisely: {question}",
+            "stream": stream
+        }
     
     async def query_local_model(self, question: str) -> Dict:
         """Query FREE local Ollama models"""
+        # An unreachable server fails every model; skip it until the probe sees it back
+        if not self.breakers.allow("ollama"):
+            return {"success": False, "error": "Ollama circuit open"}
         try:
-            # Try common free models
-            models = ["llama3.2:1b", "phi3:mini", "qwen2.5:0.5b"]
-            
-            for model in models:
+            # Go straight to the installed models, in preference order
+            for model in await self.available_models():
+                if not self.breakers.allow(f"ollama:{model}"):
+                    continue
                 try:
-                    payload = {
-                        "model": model,
-                        "prompt": f"You are an agricultural expert. Answer this farming question concisely: {question}",
-                        "stream": False
-                    }
+                    payload = self._generation_payload(model, question)
                     
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(f"{self.base_url}/api/generate", 
-                                              json=payload) as response:
-                            if response.status == 200:
-                                result = await response.json()
-                                return {
-                                    "success": True,
-                                    "response": result["response"],
-                                    "model": f"Ollama-{model} (LOCAL/FREE)",
-                                    "cost": "FREE (Local)"
-                                }
-                except Exception:
+                    async with self.http.session.post(f"{self.base_url}/api/generate", json=payload,
+                                                      timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+                        if response.status != 200:
+                            # The model may have been removed since the last inventory
+                            self._record_failure(model, f"HTTP {response.status}")
+                            self.invalidate_inventory()
+                        else:
+                            result = await response.json()
+                            self._record_success(model)
+                            return {
+                                "success": True,
+                                "response": result["response"],
+                                "model": f"Ollama-{model} (LOCAL/FREE)",
+                                "cost": "FREE (Local)"
+                            }
+                except Exception as e:
+                    self._record_failure(model, e)
+                    self.invalidate_inventory()
                     continue
             
             return {"success": False, "error": "No local models available"}
             
         except Exception as e:
             return {"success": False, "error": str(e)}
+    
+    async def stream_local_model(self, question: str) -> AsyncIterator[Dict]:
+        """Stream an answer from the first model that starts generating.
+        
+        Yields {"token": ...} items as Ollama produces them, then one
+        {"done": True, "model": ...} item. A model that fails before its first
+        token is skipped; a failure after that is raised.
+        """
+        if not self.breakers.allow("ollama"):
+            return
+        for model in await self.available_models():
+            if not self.breakers.allow(f"ollama:{model}"):
+                continue
+            streamed = False
+            try:
+                payload = self._generation_payload(model, question, stream=True)
+                async with self.http.session.post(f"{self.base_url}/api/generate", json=payload,
+                                                  timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+                    if response.status != 200:
+                        self._record_failure(model, f"HTTP {response.status}")
+                        self.invalidate_inventory()
+                        continue
+                    async for chunk in iter_ndjson(response):
+                        if chunk.get("error"):
+                            raise RuntimeError(chunk["error"])
+                        if chunk.get("response"):
+                            streamed = True
+                            yield {"token": chunk["response"]}
+                        if chunk.get("done"):
+                            break
+                self._record_success(model)
+                yield {"done": True, "model": f"Ollama-{model} (LOCAL/FREE)", "cost": "FREE (Local)"}
+                return
+            except Exception as e:
+                self._record_failure(model, e)
+                self.invalidate_inventory()
+                if streamed:
+                    raise
 
 class GoogleTranslateFree:
     """Google Translate FREE API"""
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None):
+        self.http = http or default_pool()
         self.api_key = os.getenv("GOOGLE_TRANSLATE_API_KEY")  # FREE tier: 500K chars/month
         self.base_url = "https://translation.googleapis.com/language/translate/v2"
+        # Repeated texts come from the cache; concurrent ones share requests
+        self.batcher = BatchingTranslator(self._translate_batch)
     
     async def translate_text(self, text: str, target_language: str, source_language: str = "auto") -> Dict:
         """FREE translation service"""
         try:
-            params = {
-                "key": self.api_key,
-                "q": text,
-                "target": target_language,
-                "source": source_language
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.base_url, params=params) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        translated_text = result["data"]["translations"][0]["translatedText"]
-                        return {
-                            "success": True,
-                            "translated_text": translated_text,
-                            "detected_language": result["data"]["translations"][0].get("detectedSourceLanguage"),
-                            "cost": "FREE (500K chars/month)"
-                        }
-                    else:
-                        return {"success": False, "error": f"Translation API Error: {response.status}"}
-                        
+            translated_text, detected_language = await self.batcher.translate_detected(
+                text, target_language, source_language)
         except Exception as e:
             return {"success": False, "error": str(e)}
+        return {
+            "success": True,
+            "translated_text": translated_text,
+            "detected_language": detected_language,
+            "cost": "FREE (500K chars/month)"
+        }
+    
+    async def translate_batch(self, texts: List[str], target_language: str,
+                              source_language: str = "auto") -> List[Optional[str]]:
+        """Translations of several texts, None where one failed"""
+        return await self.batcher.translate_many(texts, target_language, source_language)
+    
+    async def _translate_batch(self, texts: List[str], target_language: str, source_language: str) -> List[Tuple]:
+        # One q parameter per text; sent as a form body, since a batch can outgrow a URL
+        params = [("key", self.api_key), ("target", target_language), ("source", source_language)]
+        params.extend(("q", text) for text in texts)
+        async with self.http.session.post(self.base_url, data=params) as response:
+            if response.status != 200:
+                raise RuntimeError(f"Translation API Error: {response.status}")
+            result = await response.json()
+        return [(translation["translatedText"], translation.get("detectedSourceLanguage"))
+                for translation in result["data"]["translations"]]
+    
+    async def close(self):
+        await self.batcher.close()
 
 class FreeAIOrchestrator:
     """Orchestrates all FREE AI services"""
-    def __init__(self, knowledge_base):
+    def __init__(self, knowledge_base, searcher=None, http: Optional[HTTPClientPool] = None):
         self.knowledge_base = knowledge_base
-        self.groq_client = GroqClient()
-        self.hf_client = HuggingFaceFreeClient()
-        self.ollama_client = OllamaLocalClient()
-        self.translator = GoogleTranslateFree()
+        self.searcher = searcher  # Shared async search (micro-batcher or search pool), if any
+        # Backends and models that keep failing are skipped until their circuit closes again
+        self.breakers = CircuitBreakerRegistry()
+        self.groq_client = GroqClient(http, self.breakers)
+        self.hf_client = HuggingFaceFreeClient(http, self.breakers)
+        self.ollama_client = OllamaLocalClient(http, self.breakers)
+        self.translator = GoogleTranslateFree(http)
+        # Knowledge base answers translated ahead of time (python -m app.services.translation_store)
+        self.translations = TranslationStore(knowledge_base.index_store.index_dir)
+        # Groq, local Ollama and Hugging Face run hedged: a slow tier gets the next one started alongside it.
+        # Hugging Face is rate limited, so until Ollama has latencies to go by it gets its whole
+        # request timeout before Hugging Face starts
+        self.hedger = HedgedRunner(cold_delays={"ollama": self.ollama_client.request_timeout})
+        # Model answers are reused for repeat questions instead of generated again
+        self.response_cache = ResponseCache()
+        # ...and for paraphrases of questions already answered
+        self.semantic_cache = SemanticCache(knowledge_base.embedder)
+        # Concurrent identical questions (e.g. after a broadcast) share one generation
+        self.in_flight = SingleFlight()
     
-    async def generate_response_free(self, question: str, language: str = "en") -> Dict:
-        """Generate response using only FREE services"""
+    async def start(self):
+        """Background work tied to the app lifespan (started and stopped by the service container)"""
+        self.ollama_client.start_inventory_refresh()
+        self.breakers.start()
+    
+    async def close(self):
+        await self.breakers.stop()
+        await self.ollama_client.stop_inventory_refresh()
+        self.response_cache.close()
+        self.translations.close()
+        await self.translator.close()
+    
+    async def generate_response_free(self, question: str, language: str = "en",
+                                     filters: Optional[Dict[str, str]] = None,
+                                     timeout: Optional[float] = SINGLE_FLIGHT_TIMEOUT) -> Dict:
+        """Generate response using only FREE services.
         
+        Concurrent calls with the same normalized question, language and
+        filters share one model generation. A caller that has waited timeout
+        seconds gets the referral answer built from its knowledge base
+        matches while the generation carries on.
+        """
         # Step 1: Knowledge Base (LOCAL/FREE - highest priority)
-        knowledge_results = self.knowledge_base.search_knowledge(question, top_k=3)
+        knowledge_results = await self.search_knowledge(question, top_k=3, filters=filters)
         
         if knowledge_results and knowledge_results[0]['confidence'] > 0.8:
-            best_match = knowledge_results[0]
-            
-            # Translate if needed (FREE)
-            response_text = best_match['answer']
-            if language == 'hi' and not self.is_hindi_text(response_text):
-                translation = await self.translator.translate_text(response_text, 'hi')
-                if translation["success"]:
-                    response_text = translation["translated_text"]
-            
-            return {
-                "response": response_text,
-                "confidence": best_match['confidence'],
-                "model_used": "Knowledge Base (FREE)",
-                "source": "Agricultural Expert Knowledge",
-                "cost": "FREE",
-                "success": True
-            }
+            return await self._knowledge_response(knowledge_results[0], language)
         
-        # Step 2: Groq (FREE, ultra-fast)
-        groq_result = await self.groq_client.agricultural_chat(question, language)
-        if groq_result["success"]:
-            return {
-                "response": groq_result["response"],
-                "confidence": 0.75,
-                "model_used": groq_result["model"],
-                "source": "Groq FREE API",
-                "cost": "FREE",
-                "success": True
-            }
+        key = (normalize_query(question), language, tuple(sorted((filters or {}).items())))
+        try:
+            result = await self.in_flight.run(
+                key, lambda: self._generate_response(question, language, knowledge_results), timeout)
+        except asyncio.TimeoutError:
+            return self._knowledge_fallback(knowledge_results)
+        # Each caller gets its own copy of the shared answer
+        return dict(result)
+    
+    async def _generate_response(self, question: str, language: str, knowledge_results: List[Dict]) -> Dict:
+        # A model answer to the same question, or a close paraphrase, from an earlier request
+        cached = await self._cached_answer(question, language)
+        if cached is not None:
+            return cached
         
-        # Step 3: Local Ollama (FREE)
-        ollama_result = await self.ollama_client.query_local_model(question)
-        if ollama_result["success"]:
-            return {
-                "response": ollama_result["response"],
+        # Steps 2-4: Groq, local Ollama, Hugging Face, hedged by their latencies
+        winner = await self.hedger.run([
+            ("groq", lambda: self._groq_response(question, language)),
+            ("ollama", lambda: self._ollama_response(question)),
+            ("hugging_face", lambda: self._hf_response(question))
+        ])
+        if winner is not None:
+            await self._remember_answer(question, language, *winner)
+            return winner[1]
+        
+        return self._knowledge_fallback(knowledge_results)
+    
+    async def stream_response_free(self, question: str, language: str = "en",
+                                   filters: Optional[Dict[str, str]] = None) -> AsyncIterator[Dict]:
+        """generate_response_free as events: answer tokens as they are produced, then the metadata.
+        
+        Knowledge base and hosted answers arrive in one token event; local
+        Ollama models stream token by token.
+        """
+        knowledge_results = await self.search_knowledge(question, top_k=3, filters=filters)
+        
+        if knowledge_results and knowledge_results[0]['confidence'] > 0.8:
+            async for event in result_events(await self._knowledge_response(knowledge_results[0], language)):
+                yield event
+            return
+        
+        cached = await self._cached_answer(question, language)
+        if cached is not None:
+            async for event in result_events(cached):
+                yield event
+            return
+        
+        groq_response = await self._groq_response(question, language)
+        if groq_response is not None:
+            await self._remember_answer(question, language, "groq", groq_response)
+            async for event in result_events(groq_response):
+                yield event
+            return
+        
+        tokens = []
+        async for chunk in self.ollama_client.stream_local_model(question):
+            if "token" in chunk:
+                tokens.append(chunk["token"])
+                yield token_event(chunk["token"])
+                continue
+            result = {
+                "response": "".join(tokens),
                 "confidence": 0.7,
-                "model_used": ollama_result["model"],
+                "model_used": chunk["model"],
                 "source": "Local AI Model",
                 "cost": "FREE",
                 "success": True
             }
+            await self._remember_answer(question, language, "ollama", result)
+            yield done_event(result)
+            return
         
-        # Step 4: Hugging Face Free (FREE)
-        hf_result = await self.hf_client.query_free_models(question)
-        if hf_result["success"]:
-            return {
-                "response": hf_result["response"],
-                "confidence": 0.65,
-                "model_used": hf_result["model"],
-                "source": "Hugging Face FREE",
-                "cost": "FREE",
-                "success": True
-            }
+        hf_response = await self._hf_response(question)
+        if hf_response is not None:
+            await self._remember_answer(question, language, "hugging_face", hf_response)
+        async for event in result_events(hf_response or self._knowledge_fallback(knowledge_results)):
+            yield event
+    
+    async def _cached_answer(self, question: str, language: str) -> Optional[Dict]:
+        cached = await self.response_cache.get(question, language, MODEL_TIERS)
+        if cached is None:
+            cached = await self.semantic_cache.get(question, language)
+            if cached is not None:
+                # Repeats of this wording then skip the embedder
+                await self.response_cache.put(question, language, *cached)
+        return cached[1] if cached is not None else None
+    
+    async def _remember_answer(self, question: str, language: str, backend: str, answer: Dict):
+        await self.response_cache.put(question, language, backend, answer)
+        await self.semantic_cache.put(question, language, backend, answer)
+    
+    async def _knowledge_response(self, best_match: Dict, language: str) -> Dict:
+        # Translate if needed (FREE): precomputed, else translated now and stored
+        response_text = best_match['answer']
+        if language == 'hi' and not self.is_hindi_text(response_text):
+            translated = await self.translations.get(response_text, 'hi')
+            if translated is None:
+                translation = await self.translator.translate_text(response_text, 'hi')
+                if translation["success"]:
+                    translated = translation["translated_text"]
+                    await self.translations.put(response_text, 'hi', translated)
+            if translated is not None:
+                response_text = translated
         
+        return {
+            "response": response_text,
+            "confidence": best_match['confidence'],
+            "model_used": "Knowledge Base (FREE)",
+            "source": "Agricultural Expert Knowledge",
+            "cost": "FREE",
+            "success": True
+        }
+    
+    async def _groq_response(self, question: str, language: str) -> Optional[Dict]:
+        groq_result = await self.groq_client.agricultural_chat(question, language)
+        if not groq_result["success"]:
+            return None
+        return {
+            "response": groq_result["response"],
+            "confidence": 0.75,
+            "model_used": groq_result["model"],
+            "source": "Groq FREE API",
+            "cost": "FREE",
+            "success": True
+        }
+    
+    async def _ollama_response(self, question: str) -> Optional[Dict]:
+        ollama_result = await self.ollama_client.query_local_model(question)
+        if not ollama_result["success"]:
+            return None
+        return {
+            "response": ollama_result["response"],
+            "confidence": 0.7,
+            "model_used": ollama_result["model"],
+            "source": "Local AI Model",
+            "cost": "FREE",
+            "success": True
+        }
+    
+    async def _hf_response(self, question: str) -> Optional[Dict]:
+        hf_result = await self.hf_client.query_free_models(question)
+        if not hf_result["success"]:
+            return None
+        return {
+            "response": hf_result["response"],
+            "confidence": 0.65,
+            "model_used": hf_result["model"],
+            "source": "Hugging Face FREE",
+            "cost": "FREE",
+            "success": True
+        }
+    
+    async def get_service_status(self) -> Dict:
+        """Status of the FREE services, with the circuit breaker of every backend and model"""
+        return {
+            "groq": {"status": "active" if self.groq_client.api_key else "needs_api_key"},
+            "hugging_face": {"status": "active" if self.hf_client.api_key else "needs_api_key"},
+            "ollama_local": {"status": "unreachable" if not self.breakers.available("ollama") else "optional"},
+            "hedging": self.hedger.stats(),
+            "circuits": self.breakers.stats(),
+            "response_cache": self.response_cache.stats(),
+            "semantic_cache": self.semantic_cache.stats(),
+            "single_flight": self.in_flight.stats()
+        }
+    
+    def _knowledge_fallback(self, knowledge_results: List[Dict]) -> Dict:
+        """Answer when no model tier did: the closest knowledge entry, else a referral"""
         # Step 5: Knowledge Base Fallback (always available)
         if knowledge_results:
             return {
@@ -255,6 +622,13 @@ class FreeAIOrchestrator:
             "success": True
         }
     
+    async def search_knowledge(self, question: str, top_k: int = 3,
+                               filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """Knowledge base search, run off the event loop when a searcher is set"""
+        if self.searcher is not None:
+            return await self.searcher.search(question, top_k, filters)
+        return self.knowledge_base.search_knowledge(question, top_k=top_k, filters=filters)
+    
     def is_hindi_text(self, text: str) -> bool:
         """Check if text contains Hindi characters"""
         return any('\u0900' <= char <= '\u097F' for char in text)
\ No newline at end of file
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A backend that has not answered within this percentile of its past latencies gets hedged
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "90"))
+# Hedge delay bounds, and the delay used until a backend has HEDGE_MIN_SAMPLES latencies
+# (unless the runner was given one for it, e.g. the timeout of a backend followed by a rate-limited one)
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5"))
+HEDGE_MAX_DELAY = float(os.getenv("LLM_HEDGE_MAX_DELAY", "10"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "4"))
+HEDGE_MIN_SAMPLES = 10
+# How long a higher-priority backend that is still running may take to beat an answer that came in first
+HEDGE_PRIORITY_GRACE = float(os.getenv("LLM_HEDGE_PRIORITY_GRACE", "0.3"))
+LATENCY_WINDOW = 200
+
+Backend = Tuple[str, Callable[[], Awaitable[Optional[Dict]]]]
+
+class HedgedRunner:
+    """Runs backends in priority order, starting the next one early when the current one is slow.
+
+    The next backend starts as soon as the latest one fails, or once the
+    latest one has been running longer than the HEDGE_PERCENTILE of its own
+    past latencies. The first acceptable answer wins and the other
+    calls are cancelled; an answer from a higher-priority backend that
+    arrives within HEDGE_PRIORITY_GRACE still takes precedence. Until a
+    backend has enough latencies, its delay comes from cold_delays, or
+    HEDGE_DEFAULT_DELAY.
+    """
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, grace: float = HEDGE_PRIORITY_GRACE,
+                 cold_delays: Optional[Dict[str, float]] = None):
+        self.percentile = percentile
+        self.grace = grace
+        self.cold_delays = dict(cold_delays or {})
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.wins: Dict[str, int] = {}
+        self.hedges = 0
+        self.cancelled = 0
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait on a backend before starting the next one"""
+        samples = self.latencies.get(name)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return self.cold_delays.get(name, HEDGE_DEFAULT_DELAY)
+        ordered = sorted(samples)
+        position = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))
+        return min(max(ordered[position], HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    async def run(self, backends: List[Backend]) -> Optional[Tuple[str, Dict]]:
+        """(backend name, answer) of the winning backend, or None if every backend failed.
+
+        A backend answers with a result dict, or None when it has no
+        acceptable answer.
+        """
+        tasks: List[asyncio.Task] = []
+        started_at: List[float] = []
+        try:
+            while True:
+                if len(tasks) < len(backends) and (not tasks or tasks[-1].done()):
+                    # The latest backend failed (or none started yet): no point waiting out its hedge delay
+                    self._start(backends, tasks, started_at)
+                    continue
+
+                running = [task for task in tasks if not task.done()]
+                if not running:
+                    return None
+
+                timeout = None
+                if len(tasks) < len(backends):
+                    latest = len(tasks) - 1
+                    hedge_at = started_at[latest] + self.hedge_delay(backends[latest][0])
+                    timeout = max(0.0, hedge_at - time.monotonic())
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    self.hedges += 1
+                    logger.info(f"Hedging: {backends[len(tasks) - 1][0]} is slow, "
+                                f"starting {backends[len(tasks)][0]}")
+                    self._start(backends, tasks, started_at)
+                    continue
+
+                winner = self._best_answer(tasks)
+                if winner is None:
+                    continue
+                # A higher-priority backend still running gets a short grace period to win instead
+                pending = [task for task in tasks[:winner] if not task.done()]
+                if pending and self.grace > 0:
+                    await asyncio.wait(pending, timeout=self.grace)
+                    winner = self._best_answer(tasks)
+                name = backends[winner][0]
+                self.wins[name] = self.wins.get(name, 0) + 1
+                return name, self._answer(tasks[winner])
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    self.cancelled += 1
+
+    def _start(self, backends: List[Backend], tasks: List[asyncio.Task], started_at: List[float]):
+        name, call = backends[len(tasks)]
+        started_at.append(time.monotonic())
+        tasks.append(asyncio.create_task(self._timed(name, call, started_at[-1]), name=f"hedged-{name}"))
+
+    async def _timed(self, name: str, call: Callable[[], Awaitable[Optional[Dict]]], started_at: float):
+        answer = await call()
+        if answer is not None:
+            # Every answer counts, winner or not, so each backend's hedge delay stays current
+            self.latencies.setdefault(name, deque(maxlen=LATENCY_WINDOW)).append(time.monotonic() - started_at)
+        return answer
+
+    @staticmethod
+    def _answer(task: asyncio.Task) -> Optional[Dict]:
+        if not task.done() or task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+
+    def _best_answer(self, tasks: List[asyncio.Task]) -> Optional[int]:
+        """Index of the highest-priority backend that has answered"""
+        for position, task in enumerate(tasks):
+            if self._answer(task) is not None:
+                return position
+        return None
+
+    def stats(self) -> Dict:
+        return {
+            "percentile": self.percentile,
+            "hedge_delays": {name: round(self.hedge_delay(name), 3) for name in self.latencies},
+            "wins": dict(self.wins),
+            "hedges": self.hedges,
+            "cancelled": self.cancelled
+        }
@@ -1,13 +1,38 @@
 import os
+import time
 import requests
 import asyncio
 import aiohttp
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from .knowledge_base import AgricultureKnowledgeBase
+from .http_client import HTTPClientPool, default_pool
+from .streaming import done_event, iter_ndjson, result_events, token_event
+from .hedging import Backend, HedgedRunner
+from .circuit_breaker import CircuitBreakerRegistry
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+from .translation_store import TranslationStore
+from .translation_cache import BatchingTranslator
+from .single_flight import SINGLE_FLIGHT_TIMEOUT, SingleFlight
+from .query_cache import normalize_query
+
+# Seconds between background refreshes of the installed Ollama models
+OLLAMA_INVENTORY_INTERVAL = float(os.getenv("OLLAMA_INVENTORY_INTERVAL", "60"))
+
+# Hugging Face statuses that concern the whole API (auth, rate limit) rather than one model
+API_WIDE_STATUSES = (401, 403, 429)
 
 class OllamaLocalClient:
     """Ollama - 100% FREE local models"""
-    def __init__(self):
+    request_timeout = 30.0
+    
+    def __init__(self, http: Optional[HTTPClientPool] = None,
+                 breakers: Optional[CircuitBreakerRegistry] = None):
+        self.http = http or default_pool()
+        # "ollama" trips when the server is unreachable and is probed via /api/tags;
+        # "ollama:<model>" trips when a model keeps failing or timing out
+        self.breakers = breakers or CircuitBreakerRegistry()
+        self.breakers.get("ollama", probe=self._probe_server)
         self.base_url = "http://localhost:11434"  # Local Ollama instance
         self.preferred_models = [
             "llama3.2:1b",      # Meta's efficient model (~1GB)
@@ -15,67 +40,159 @@ class OllamaLocalClient:
             "gemma:2b",         # Google's small model (~1.5GB)
             "qwen2.5:0.5b"      # Alibaba's tiny model (~0.5GB)
         ]
+        # Installed models from /api/tags; None until the first inventory
+        self.installed_models: Optional[List[str]] = None
+        self.inventory_checked_at: Optional[float] = None
+        self.inventory_error: Optional[str] = None
+        self._inventory_lock: Optional[asyncio.Lock] = None
+        self._refresh_now: Optional[asyncio.Event] = None
+        self._refresh_task: Optional[asyncio.Task] = None
     
-    async def ensure_model_available(self, model: str = "llama3.2:1b") -> bool:
-        """Check if model is available locally, download if needed"""
+    async def refresh_inventory(self) -> List[str]:
+        """Fetch the installed models from Ollama (none when it is not running)"""
         try:
-            # Check if model exists
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/api/tags") as response:
-                    if response.status == 200:
-                        models_data = await response.json()
-                        available_models = [m['name'] for m in models_data.get('models', [])]
-                        return model in available_models
-            return False
+            async with self.http.session.get(f"{self.base_url}/api/tags",
+                                             timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"Ollama /api/tags returned {response.status}")
+                models_data = await response.json()
+            self.installed_models = [m['name'] for m in models_data.get('models', [])]
+            self.inventory_error = None
         except Exception as e:
-            print(f"Ollama connection error: {e}")
-            return False
+            self.installed_models = []
+            self.inventory_error = str(e)
+        self.inventory_checked_at = time.time()
+        return self.installed_models
+    
+    async def _probe_server(self) -> bool:
+        await self.refresh_inventory()
+        return self.inventory_error is None
+    
+    def _record_success(self, model: str):
+        self.breakers.get("ollama").record_success()
+        self.breakers.get(f"ollama:{model}").record_success()
+    
+    def _record_failure(self, model: str, error):
+        if isinstance(error, aiohttp.ClientConnectorError):
+            self.breakers.get("ollama").record_failure(error)
+        else:
+            self.breakers.get(f"ollama:{model}").record_failure(error)
+    
+    def start_inventory_refresh(self, interval: float = OLLAMA_INVENTORY_INTERVAL):
+        """Keep the inventory fresh in the background instead of probing on every request"""
+        if self._refresh_task is None:
+            self._refresh_now = asyncio.Event()
+            self._refresh_task = asyncio.create_task(self._refresh_loop(interval))
+    
+    async def stop_inventory_refresh(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+    
+    async def _refresh_loop(self, interval: float):
+        while True:
+            await self.refresh_inventory()
+            try:
+                await asyncio.wait_for(self._refresh_now.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_now.clear()
+    
+    def invalidate_inventory(self):
+        """Re-check the installed models right away, e.g. after a model failed"""
+        if self._refresh_task is not None:
+            self._refresh_now.set()
+        else:
+            self.installed_models = None
+    
+    async def available_models(self) -> List[str]:
+        """Installed preferred models, in preference order"""
+        if self.installed_models is None:
+            if self._inventory_lock is None:
+                self._inventory_lock = asyncio.Lock()
+            # Concurrent first requests share one /api/tags call
+            async with self._inventory_lock:
+                if self.installed_models is None:
+                    await self.refresh_inventory()
+        return [model for model in self.preferred_models if model in self.installed_models]
+    
+    async def ensure_model_available(self, model: str = "llama3.2:1b") -> bool:
+        """Check if model is available locally, from the cached inventory"""
+        if self.installed_models is None:
+            await self.available_models()
+        return model in self.installed_models
+    
+    def inventory(self) -> Dict:
+        """Which preferred models are installed, as of the last inventory"""
+        installed = self.installed_models or []
+        return {
+            "base_url": self.base_url,
+            "preferred_models": self.preferred_models,
+            "available_models": [model for model in self.preferred_models if model in installed],
+            "installed_models": installed,
+            "checked_at": self.inventory_checked_at,
+            "error": self.inventory_error,
+            "refresh_interval": OLLAMA_INVENTORY_INTERVAL if self._refresh_task is not None else None
+        }
+    
+    def _generation_payload(self, model: str, question: str, language: str, stream: bool = False) -> Dict:
+        # Craft agricultural prompt
+        system_prompt = {
+            "en": "You are an expert agricultural advisor for Indian farmers. Provide practical, actionable advice in simple language. Focus on fertilizers, pest control, crop timing, and government schemes.",
+            "hi": "आप भारतीय किसानों के लिए एक कुशल कृषि सलाहकार हैं। सरल भाषा में व्यावहारिक सलाह दें। उर्वरक, कीट नियंत्रण, फसल का समय, और सरकारी योजनाओं पर ध्यान दें।"
+        }
+        
+        prompt = f"{system_prompt.get(language, system_prompt['en'])}\n\nQuestion: {question}\nAnswer:"
+        
+        return {
+            "model": model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "top_k": 40,
+                "num_predict": 200  # Limit response length
+            }
+        }
     
     async def query_agricultural_model(self, question: str, language: str = "en") -> Dict:
         """Query FREE local Ollama models for agricultural advice"""
         
-        # Try preferred models in order
-        for model in self.preferred_models:
+        if not self.breakers.allow("ollama"):
+            return {"success": False, "error": "Ollama circuit open", "model": "Ollama (LOCAL/FREE)"}
+        
+        # Go straight to the installed models, in preference order
+        for model in await self.available_models():
+            if not self.breakers.allow(f"ollama:{model}"):
+                continue
             try:
-                # Check if model is available
-                if not await self.ensure_model_available(model):
-                    continue
-                
-                # Craft agricultural prompt
-                system_prompt = {
-                    "en": "You are an expert agricultural advisor for Indian farmers. Provide practical, actionable advice in simple language. Focus on fertilizers, pest control, crop timing, and government schemes.",
-                    "hi": "आप भारतीय किसानों के लिए एक कुशल कृषि सलाहकार हैं। सरल भाषा में व्यावहारिक सलाह दें। उर्वरक, कीट नियंत्रण, फसल का समय, और सरकारी योजनाओं पर ध्यान दें।"
-                }
-                
-                prompt = f"{system_prompt.get(language, system_prompt['en'])}\n\nQuestion: {question}\nAnswer:"
+                payload = self._generation_payload(model, question, language)
                 
-                payload = {
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "top_k": 40,
-                        "num_predict": 200  # Limit response length
-                    }
-                }
-                
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
-                    async with session.post(f"{self.base_url}/api/generate", 
-                                          json=payload) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            return {
-                                "success": True,
-                                "response": result.get("response", "").strip(),
-                                "model": f"Ollama-{model} (100% FREE)",
-                                "cost": "FREE (Local)",
-                                "processing_time": result.get("total_duration", 0) / 1e9  # Convert to seconds
-                            }
+                async with self.http.session.post(f"{self.base_url}/api/generate", json=payload,
+                                                  timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+                    if response.status == 200:
+                        result = await response.json()
+                        self._record_success(model)
+                        return {
+                            "success": True,
+                            "response": result.get("response", "").strip(),
+                            "model": f"Ollama-{model} (100% FREE)",
+                            "cost": "FREE (Local)",
+                            "processing_time": result.get("total_duration", 0) / 1e9  # Convert to seconds
+                        }
+                    # The model may have been removed since the last inventory
+                    self._record_failure(model, f"HTTP {response.status}")
+                    self.invalidate_inventory()
                         
             except Exception as e:
                 print(f"Ollama model {model} failed: {e}")
+                self._record_failure(model, e)
+                self.invalidate_inventory()
                 continue
         
         return {
@@ -83,10 +200,57 @@ class OllamaLocalClient:
             "error": "No Ollama models available. Please install: ollama pull llama3.2:1b",
             "model": "Ollama (LOCAL/FREE)"
         }
-
+    
+    async def stream_agricultural_model(self, question: str, language: str = "en") -> AsyncIterator[Dict]:
+        """Stream an answer from the first installed model that starts generating.
+        
+        Yields {"token": ...} items as Ollama produces them, then one
+        {"done": True, "model": ...} item. A model that fails before its first
+        token is skipped; a failure after that is raised, since the tokens
+        already went out. Yields nothing when no model answers.
+        """
+        if not self.breakers.allow("ollama"):
+            return
+        for model in await self.available_models():
+            if not self.breakers.allow(f"ollama:{model}"):
+                continue
+            streamed = False
+            try:
+                payload = self._generation_payload(model, question, language, stream=True)
+                async with self.http.session.post(f"{self.base_url}/api/generate", json=payload,
+                                                  timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+                    if response.status != 200:
+                        self._record_failure(model, f"HTTP {response.status}")
+                        self.invalidate_inventory()
+                        continue
+                    chunk = {}
+                    async for chunk in iter_ndjson(response):
+                        if chunk.get("error"):
+                            raise RuntimeError(chunk["error"])
+                        if chunk.get("response"):
+                            streamed = True
+                            yield {"token": chunk["response"]}
+                        if chunk.get("done"):
+                            break
+                self._record_success(model)
+                yield {
+                    "done": True,
+                    "model": f"Ollama-{model} (100% FREE)",
+                    "cost": "FREE (Local)",
+                    "processing_time": chunk.get("total_duration", 0) / 1e9
+                }
+                return
+            except Exception as e:
+                print(f"Ollama model {model} failed: {e}")
+                self._record_failure(model, e)
+                self.invalidate_inventory()
+                if streamed:
+                    raise
+    
 class LibreTranslateClient:
     """LibreTranslate - 100% FREE and open-source translation"""
-    def __init__(self):
+    def __init__(self, http: Optional[HTTPClientPool] = None):
+        self.http = http or default_pool()
         self.base_url = "https://libretranslate.com/translate"
         self.supported_languages = {
             "en": "English",
@@ -100,38 +264,66 @@ class LibreTranslateClient:
             "pa": "Punjabi",
             "ur": "Urdu"
         }
+        # Repeated texts come from the cache; concurrent ones share requests
+        self.batcher = BatchingTranslator(self._translate_batch)
     
     async def translate_text(self, text: str, target_language: str, source_language: str = "auto") -> Dict:
         """100% FREE translation service - no API key needed"""
         try:
-            payload = {
-                "q": text,
-                "source": source_language,
-                "target": target_language,
-                "format": "text"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.base_url, json=payload) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return {
-                            "success": True,
-                            "translated_text": result.get("translatedText", text),
-                            "detected_language": result.get("detectedLanguage", source_language),
-                            "cost": "100% FREE (No limits)",
-                            "provider": "LibreTranslate (Open Source)"
-                        }
-                    else:
-                        error_data = await response.text()
-                        return {"success": False, "error": f"LibreTranslate API Error: {response.status} - {error_data}"}
-                        
+            translated_text, detected_language = await self.batcher.translate_detected(
+                text, target_language, source_language)
         except Exception as e:
             return {"success": False, "error": f"LibreTranslate error: {str(e)}"}
+        return {
+            "success": True,
+            "translated_text": translated_text,
+            "detected_language": detected_language if detected_language is not None else source_language,
+            "cost": "100% FREE (No limits)",
+            "provider": "LibreTranslate (Open Source)"
+        }
+    
+    async def translate_batch(self, texts: List[str], target_language: str,
+                              source_language: str = "auto") -> List[Optional[str]]:
+        """Translations of several texts, None where one failed"""
+        return await self.batcher.translate_many(texts, target_language, source_language)
+    
+    async def _translate_batch(self, texts: List[str], target_language: str, source_language: str) -> List[Tuple]:
+        # LibreTranslate takes a list of texts and answers with a list of translations
+        payload = {
+            "q": texts,
+            "source": source_language,
+            "target": target_language,
+            "format": "text"
+        }
+        async with self.http.session.post(self.base_url, json=payload) as response:
+            if response.status != 200:
+                error_data = await response.text()
+                raise RuntimeError(f"API Error: {response.status} - {error_data}")
+            result = await response.json()
+        translated = result.get("translatedText") if isinstance(result, dict) else None
+        if isinstance(translated, str):
+            translated = [translated]
+        # Caching the untranslated texts would serve them as translations from then on
+        if not isinstance(translated, list) or not all(isinstance(item, str) for item in translated):
+            raise RuntimeError(f"Malformed LibreTranslate response: {str(result)[:200]}")
+        # Only reported when the source is "auto": one detection per text
+        detected = result.get("detectedLanguage")
+        if not isinstance(detected, list):
+            detected = [detected] * len(translated)
+        return list(zip(translated, detected))
+    
+    async def close(self):
+        await self.batcher.close()
 
 class HuggingFaceFreeClient:
     """Hugging Face FREE Inference API - Agricultural Models"""
-    def __init__(self):
+    request_timeout = 20.0
+    
+    def __init__(self, http: Optional[HTTPClientPool] = None,
+                 breakers: Optional[CircuitBreakerRegistry] = None):
+        self.http = http or default_pool()
+        # "hugging_face" trips on rate limits, auth and connection failures; "hf:<model>" on a failing model
+        self.breakers = breakers or CircuitBreakerRegistry()
         self.api_key = os.getenv("HUGGINGFACE_API_KEY")  # Get from environment variable
         self.base_url = "https://api-inference.huggingface.co/models"
         
@@ -147,123 +339,296 @@ class HuggingFaceFreeClient:
     async def query_agricultural_models(self, question: str, language: str = "en") -> Dict:
         """Query multiple FREE agricultural models from Hugging Face"""
         
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-        
         for model in self.agricultural_models:
-            try:
-                url = f"{self.base_url}/{model}"
-                
-                # Craft prompt based on model type
-                if "aksara" in model:
-                    # Agricultural specialist model
-                    inputs = f"Agricultural Question: {question}\nExpert Agricultural Answer:"
-                elif "DialoGPT" in model or "blenderbot" in model:
-                    # Conversational models
-                    inputs = f"Farmer: {question}\nAgricultural Expert:"
-                else:
-                    # General models
-                    inputs = f"Question about farming: {question}\nAnswer:"
-                
-                payload = {
-                    "inputs": inputs,
-                    "parameters": {
-                        "max_new_tokens": 150,
-                        "temperature": 0.7,
-                        "do_sample": True,
-                        "top_p": 0.9,
-                        "repetition_penalty": 1.1
-                    }
-                }
-                
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=headers, json=payload, 
-                                          timeout=aiohttp.ClientTimeout(total=20)) as response:
-                        if response.status == 200:
-                            result = await response.json()
-                            
-                            # Handle different response formats
-                            if isinstance(result, list) and len(result) > 0:
-                                if "generated_text" in result[0]:
-                                    response_text = result[0]["generated_text"]
-                                    # Clean up the response
-                                    response_text = response_text.replace(inputs, "").strip()
-                                    
-                                    if len(response_text) > 10:  # Valid response
-                                        return {
-                                            "success": True,
-                                            "response": response_text,
-                                            "model": f"HF-{model.split('/')[-1]} (FREE)",
-                                            "cost": "FREE (1000 req/month)",
-                                            "provider": "Hugging Face"
-                                        }
-            except Exception as e:
-                print(f"HF model {model} failed: {e}")
-                continue
+            result = await self.query_model(model, question, language)
+            if result["success"]:
+                return result
         
         return {
             "success": False, 
             "error": "All Hugging Face models unavailable or rate limited",
             "model": "Hugging Face (FREE)"
         }
+    
+    async def query_model(self, model: str, question: str, language: str = "en") -> Dict:
+        """Query one Hugging Face model"""
+        if not self.breakers.allow("hugging_face", f"hf:{model}"):
+            return {"success": False, "error": f"HF model {model} circuit open", "model": model}
+        
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        
+        try:
+            url = f"{self.base_url}/{model}"
+            
+            # Craft prompt based on model type
+            if "aksara" in model:
+                # Agricultural specialist model
+                inputs = f"Agricultural Question: {question}\nExpert Agricultural Answer:"
+            elif "DialoGPT" in model or "blenderbot" in model:
+                # Conversational models
+                inputs = f"Farmer: {question}\nAgricultural Expert:"
+            else:
+                # General models
+                inputs = f"Question about farming: {question}\nAnswer:"
+            
+            payload = {
+                "inputs": inputs,
+                "parameters": {
+                    "max_new_tokens": 150,
+                    "temperature": 0.7,
+                    "do_sample": True,
+                    "top_p": 0.9,
+                    "repetition_penalty": 1.1
+                }
+            }
+            
+            async with self.http.session.post(url, headers=headers, json=payload,
+                                              timeout=aiohttp.ClientTimeout(total=self.request_timeout)) as response:
+                if response.status in API_WIDE_STATUSES:
+                    self.breakers.get("hugging_face").record_failure(f"HTTP {response.status}")
+                elif response.status != 200:
+                    self.breakers.get(f"hf:{model}").record_failure(f"HTTP {response.status}")
+                else:
+                    self.breakers.get("hugging_face").record_success()
+                    self.breakers.get(f"hf:{model}").record_success()
+                
+                if response.status == 200:
+                    result = await response.json()
+                    
+                    # Handle different response formats
+                    if isinstance(result, list) and len(result) > 0:
+                        if "generated_text" in result[0]:
+                            response_text = result[0]["generated_text"]
+                            # Clean up the response
+                            response_text = response_text.replace(inputs, "").strip()
+                            
+                            if len(response_text) > 10:  # Valid response
+                                return {
+                                    "success": True,
+                                    "response": response_text,
+                                    "model": f"HF-{model.split('/')[-1]} (FREE)",
+                                    "cost": "FREE (1000 req/month)",
+                                    "provider": "Hugging Face"
+                                }
+                return {"success": False, "error": f"HF model {model} returned {response.status}", "model": model}
+        except Exception as e:
+            print(f"HF model {model} failed: {e}")
+            if isinstance(e, aiohttp.ClientConnectorError):
+                self.breakers.get("hugging_face").record_failure(e)
+            else:
+                self.breakers.get(f"hf:{model}").record_failure(e)
+            return {"success": False, "error": str(e), "model": model}
 
 class ImprovedFreeAIOrchestrator:
     """Orchestrates all 100% FREE AI services with better reliability"""
-    def __init__(self, knowledge_base):
+    def __init__(self, knowledge_base, searcher=None, http: Optional[HTTPClientPool] = None):
         self.knowledge_base = knowledge_base
-        self.ollama_client = OllamaLocalClient()
-        self.hf_client = HuggingFaceFreeClient()
-        self.translator = LibreTranslateClient()
+        self.searcher = searcher  # Shared async search (micro-batcher or search pool), if any
+        # Backends and models that keep failing are skipped until their circuit closes again
+        self.breakers = CircuitBreakerRegistry()
+        self.ollama_client = OllamaLocalClient(http, self.breakers)
+        self.hf_client = HuggingFaceFreeClient(http, self.breakers)
+        self.translator = LibreTranslateClient(http)
+        # Knowledge base answers translated ahead of time (python -m app.services.translation_store)
+        self.translations = TranslationStore(knowledge_base.index_store.index_dir)
+        # Local and hosted models run hedged: a slow one gets the next one started alongside it.
+        # Every tier after the first is a rate-limited Hugging Face model, so until a tier has
+        # latencies to go by it gets its whole request timeout before the next one starts
+        cold_delays = {f"hf:{model}": self.hf_client.request_timeout for model in self.hf_client.agricultural_models}
+        cold_delays["ollama"] = self.ollama_client.request_timeout
+        self.hedger = HedgedRunner(cold_delays=cold_delays)
+        # Model answers are reused for repeat questions instead of generated again
+        self.response_cache = ResponseCache()
+        # ...and for paraphrases of questions already answered
+        self.semantic_cache = SemanticCache(knowledge_base.embedder)
+        # Concurrent identical questions (e.g. after a broadcast) share one generation
+        self.in_flight = SingleFlight()
+    
+    async def start(self):
+        """Background work tied to the app lifespan (started and stopped by the service container)"""
+        self.ollama_client.start_inventory_refresh()
+        self.breakers.start()
+    
+    async def close(self):
+        await self.breakers.stop()
+        await self.ollama_client.stop_inventory_refresh()
+        self.response_cache.close()
+        self.translations.close()
+        await self.translator.close()
     
-    async def generate_response_free(self, question: str, language: str = "en") -> Dict:
-        """Generate response using only 100% FREE services with smart fallbacks"""
+    async def generate_response_free(self, question: str, language: str = "en",
+                                     filters: Optional[Dict[str, str]] = None,
+                                     timeout: Optional[float] = SINGLE_FLIGHT_TIMEOUT) -> Dict:
+        """Generate response using only 100% FREE services with smart fallbacks.
         
+        Concurrent calls with the same normalized question, language and
+        filters share one model generation. A caller that has waited timeout
+        seconds gets the referral answer built from its knowledge base
+        matches while the generation carries on.
+        """
         # Step 1: Knowledge Base (LOCAL/FREE - highest priority, fastest)
-        knowledge_results = self.knowledge_base.search_knowledge(question, top_k=3)
+        knowledge_results = await self.search_knowledge(question, top_k=3, filters=filters)
         
         if knowledge_results and knowledge_results[0]['confidence'] > 0.8:
-            best_match = knowledge_results[0]
-            
-            # Translate if needed using FREE LibreTranslate
-            response_text = best_match['answer']
-            if language == 'hi' and not self.is_hindi_text(response_text):
-                translation = await self.translator.translate_text(response_text, 'hi', 'en')
-                if translation["success"]:
-                    response_text = translation["translated_text"]
-            
-            return {
-                "response": response_text,
-                "confidence": best_match['confidence'],
-                "model_used": "Knowledge Base (100% FREE)",
-                "source": "Agricultural Expert Knowledge",
-                "cost": "FREE (Unlimited)",
-                "success": True
-            }
+            return await self._knowledge_response(knowledge_results[0], language)
         
-        # Step 2: Ollama Local (100% FREE, unlimited, slower but reliable)
-        ollama_result = await self.ollama_client.query_agricultural_model(question, language)
-        if ollama_result["success"]:
-            return {
-                "response": ollama_result["response"],
+        key = (normalize_query(question), language, tuple(sorted((filters or {}).items())))
+        try:
+            result = await self.in_flight.run(
+                key, lambda: self._generate_response(question, language, knowledge_results), timeout)
+        except asyncio.TimeoutError:
+            return self._knowledge_fallback(knowledge_results)
+        # Each caller gets its own copy of the shared answer
+        return dict(result)
+    
+    async def _generate_response(self, question: str, language: str, knowledge_results: List[Dict]) -> Dict:
+        # A model answer to the same question, or a close paraphrase, from an earlier request
+        cached = await self._cached_answer(question, language)
+        if cached is not None:
+            return cached
+        
+        # Steps 2-3: Ollama Local, then each Hugging Face model, hedged by their latencies
+        winner = await self.hedger.run(self._model_backends(question, language))
+        if winner is not None:
+            await self._remember_answer(question, language, *winner)
+            return winner[1]
+        
+        return self._knowledge_fallback(knowledge_results)
+    
+    async def stream_response_free(self, question: str, language: str = "en",
+                                   filters: Optional[Dict[str, str]] = None) -> AsyncIterator[Dict]:
+        """generate_response_free as events: answer tokens as they are produced, then the metadata.
+        
+        Knowledge base and hosted answers arrive in one token event; local
+        Ollama models stream token by token.
+        """
+        knowledge_results = await self.search_knowledge(question, top_k=3, filters=filters)
+        
+        if knowledge_results and knowledge_results[0]['confidence'] > 0.8:
+            async for event in result_events(await self._knowledge_response(knowledge_results[0], language)):
+                yield event
+            return
+        
+        cached = await self._cached_answer(question, language)
+        if cached is not None:
+            async for event in result_events(cached):
+                yield event
+            return
+        
+        tokens = []
+        async for chunk in self.ollama_client.stream_agricultural_model(question, language):
+            if "token" in chunk:
+                tokens.append(chunk["token"])
+                yield token_event(chunk["token"])
+                continue
+            result = {
+                "response": "".join(tokens).strip(),
                 "confidence": 0.75,
-                "model_used": ollama_result["model"],
+                "model_used": chunk["model"],
                 "source": "Local AI Model",
                 "cost": "100% FREE (Local)",
                 "success": True,
-                "processing_time": ollama_result.get("processing_time", 0)
+                "processing_time": chunk["processing_time"]
             }
+            await self._remember_answer(question, language, "ollama", result)
+            yield done_event(result)
+            return
         
-        # Step 3: Hugging Face Free (FREE with monthly limits)
-        hf_result = await self.hf_client.query_agricultural_models(question, language)
-        if hf_result["success"]:
-            return {
-                "response": hf_result["response"],
-                "confidence": 0.7,
-                "model_used": hf_result["model"],
-                "source": "Hugging Face FREE API",
-                "cost": hf_result["cost"],
-                "success": True
-            }
+        winner = await self.hedger.run(self._model_backends(question, language, local=False))
+        if winner is not None:
+            await self._remember_answer(question, language, *winner)
+        result = winner[1] if winner is not None else self._knowledge_fallback(knowledge_results)
+        async for event in result_events(result):
+            yield event
+    
+    async def _cached_answer(self, question: str, language: str) -> Optional[Dict]:
+        cached = await self.response_cache.get(question, language, self._model_names())
+        if cached is None:
+            cached = await self.semantic_cache.get(question, language)
+            if cached is not None:
+                # Repeats of this wording then skip the embedder
+                await self.response_cache.put(question, language, *cached)
+        return cached[1] if cached is not None else None
+    
+    async def _remember_answer(self, question: str, language: str, backend: str, answer: Dict):
+        await self.response_cache.put(question, language, backend, answer)
+        await self.semantic_cache.put(question, language, backend, answer)
+    
+    async def _knowledge_response(self, best_match: Dict, language: str) -> Dict:
+        return {
+            "response": await self._translated_answer(best_match, language),
+            "confidence": best_match['confidence'],
+            "model_used": "Knowledge Base (100% FREE)",
+            "source": "Agricultural Expert Knowledge",
+            "cost": "FREE (Unlimited)",
+            "success": True
+        }
+    
+    async def _translated_answer(self, best_match: Dict, language: str) -> str:
+        """The answer in the asked language: precomputed, else from FREE LibreTranslate and stored"""
+        answer = best_match['answer']
+        source = best_match.get('language') or 'en'
+        if language == source or language not in self.translator.supported_languages:
+            return answer
+        if language == 'hi' and self.is_hindi_text(answer):
+            return answer
         
+        translated = await self.translations.get(answer, language)
+        if translated is not None:
+            return translated
+        translation = await self.translator.translate_text(answer, language, source)
+        if not translation["success"]:
+            return answer
+        # Entries added after the last precompute get their translations here
+        await self.translations.put(answer, language, translation["translated_text"])
+        return translation["translated_text"]
+    
+    def _model_names(self) -> List[str]:
+        """Hedged runner names of the model tiers, in priority order"""
+        return ["ollama"] + [f"hf:{model}" for model in self.hf_client.agricultural_models]
+    
+    def _model_backends(self, question: str, language: str, local: bool = True) -> List[Backend]:
+        """Model tiers in priority order, for the hedged runner, without the ones whose circuit is open"""
+        backends = []
+        if local and self.breakers.available("ollama"):
+            backends.append(("ollama", lambda: self._ollama_response(question, language)))
+        for model in self.hf_client.agricultural_models:
+            if not self.breakers.available("hugging_face", f"hf:{model}"):
+                continue
+            backends.append((f"hf:{model}", lambda model=model: self._hf_response(model, question, language)))
+        return backends
+    
+    async def _ollama_response(self, question: str, language: str) -> Optional[Dict]:
+        # Step 2: Ollama Local (100% FREE, unlimited, slower but reliable)
+        ollama_result = await self.ollama_client.query_agricultural_model(question, language)
+        if not ollama_result["success"]:
+            return None
+        return {
+            "response": ollama_result["response"],
+            "confidence": 0.75,
+            "model_used": ollama_result["model"],
+            "source": "Local AI Model",
+            "cost": "100% FREE (Local)",
+            "success": True,
+            "processing_time": ollama_result.get("processing_time", 0)
+        }
+    
+    async def _hf_response(self, model: str, question: str, language: str) -> Optional[Dict]:
+        # Step 3: Hugging Face Free (FREE with monthly limits)
+        hf_result = await self.hf_client.query_model(model, question, language)
+        if not hf_result["success"]:
+            return None
+        return {
+            "response": hf_result["response"],
+            "confidence": 0.7,
+            "model_used": hf_result["model"],
+            "source": "Hugging Face FREE API",
+            "cost": hf_result["cost"],
+            "success": True
+        }
+    
+    def _knowledge_fallback(self, knowledge_results: List[Dict]) -> Dict:
+        """Answer when no model tier did: the closest knowledge entry, else a referral"""
         # Step 4: Knowledge Base Fallback with lower confidence (always available)
         if knowledge_results and len(knowledge_results) > 0:
             best_match = knowledge_results[0]
@@ -286,6 +651,13 @@ class ImprovedFreeAIOrchestrator:
             "success": True
         }
     
+    async def search_knowledge(self, question: str, top_k: int = 3,
+                               filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """Knowledge base search, run off the event loop when a searcher is set"""
+        if self.searcher is not None:
+            return await self.searcher.search(question, top_k, filters)
+        return self.knowledge_base.search_knowledge(question, top_k=top_k, filters=filters)
+    
     def is_hindi_text(self, text: str) -> bool:
         """Check if text contains Hindi (Devanagari) characters"""
         return any('\u0900' <= char <= '\u097F' for char in text)
@@ -296,6 +668,7 @@ class ImprovedFreeAIOrchestrator:
             "knowledge_base": {
                 "status": "active",
                 "entries": len(self.knowledge_base.knowledge_base),
+                "search": self.searcher.stats() if self.searcher else None,
                 "cost": "FREE (Unlimited)"
             },
             "ollama_local": {
@@ -311,17 +684,25 @@ class ImprovedFreeAIOrchestrator:
             "libre_translate": {
                 "status": "active",
                 "languages": len(self.translator.supported_languages),
+                "batching": self.translator.batcher.stats(),
                 "cost": "100% FREE (No limits)"
-            }
+            },
+            "hedging": self.hedger.stats(),
+            "circuits": self.breakers.stats(),
+            "response_cache": self.response_cache.stats(),
+            "semantic_cache": self.semantic_cache.stats(),
+            "translations": self.translations.stats(),
+            "single_flight": self.in_flight.stats()
         }
         
-        # Check Ollama status
-        try:
-            ollama_available = await self.ollama_client.ensure_model_available()
-            status["ollama_local"]["status"] = "active" if ollama_available else "needs_setup"
-            if ollama_available:
-                status["ollama_local"]["models"] = self.ollama_client.preferred_models
-        except:
+        # Ollama status from the cached model inventory, not a fresh probe
+        available_models = await self.ollama_client.available_models()
+        if available_models:
+            status["ollama_local"]["status"] = "active"
+            status["ollama_local"]["models"] = available_models
+        elif self.ollama_client.inventory_error:
             status["ollama_local"]["status"] = "not_installed"
+        else:
+            status["ollama_local"]["status"] = "needs_setup"
         
         return status
\ No newline at end of file
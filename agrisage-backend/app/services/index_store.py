@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+from typing import Dict, List, Optional
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class KnowledgeIndexStore:
+    """Build-once, memory-mapped knowledge base index artifact.
+
+    Each artifact lives in its own directory named after the content hash of
+    the knowledge entries and the embedder, so a change to either produces a
+    new artifact instead of silently reusing stale vectors.
+    """
+    FORMAT_VERSION = 1
+    MANIFEST_FILE = "manifest.json"
+    ENTRIES_FILE = "entries.json"
+    EMBEDDINGS_FILE = "embeddings.npy"
+    INDEX_FILE = "index-{signature}.faiss"
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+
+    @classmethod
+    def content_hash(cls, entries: List[Dict], embedder_name: str) -> str:
+        """Hash of the entries and embedder that an index was built from"""
+        digest = hashlib.sha256()
+        digest.update(f"format={cls.FORMAT_VERSION};embedder={embedder_name};".encode("utf-8"))
+        digest.update(json.dumps(entries, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    def corpus_hash(base_hash: str, corpus_path: str) -> str:
+        """Hash of a base index extended with the entries of a corpus file"""
+        digest = hashlib.sha256(base_hash.encode("utf-8"))
+        with open(corpus_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def artifact_path(self, content_hash: str) -> str:
+        return os.path.join(self.index_dir, content_hash[:16])
+
+    def index_path(self, artifact_path: str, signature: str) -> str:
+        return os.path.join(artifact_path, self.INDEX_FILE.format(signature=signature))
+
+    def load(self, content_hash: str) -> Optional[Dict]:
+        """Memory-map a previously built artifact, or return None if there is none"""
+        path = self.artifact_path(content_hash)
+        manifest_path = os.path.join(path, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("content_hash") != content_hash:
+                return None
+
+            with open(os.path.join(path, self.ENTRIES_FILE), encoding="utf-8") as f:
+                entries = json.load(f)
+            embeddings = np.load(os.path.join(path, self.EMBEDDINGS_FILE), mmap_mode="r")
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable knowledge index artifact at {path}: {e}")
+            return None
+
+        return {
+            "manifest": manifest,
+            "entries": entries,
+            "embeddings": embeddings
+        }
+
+    def exists(self, content_hash: str) -> bool:
+        """Whether an artifact was published (its manifest is written last)"""
+        return os.path.exists(os.path.join(self.artifact_path(content_hash), self.MANIFEST_FILE))
+
+    def load_embeddings(self, content_hash: str) -> Optional[np.ndarray]:
+        """Memory-map an artifact's float embedding matrix, or None if it is not on disk"""
+        path = os.path.join(self.artifact_path(content_hash), self.EMBEDDINGS_FILE)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable embeddings at {path}: {e}")
+            return None
+
+    def load_index(self, content_hash: str, signature: str):
+        """Memory-map an artifact's index of the given type, or None if it was never built.
+
+        The embeddings of an artifact are shared by every index type built from them.
+        """
+        path = self.index_path(self.artifact_path(content_hash), signature)
+        if not os.path.exists(path):
+            return None
+        try:
+            return self._read_index(path)
+        except RuntimeError as e:
+            logger.warning(f"Ignoring unreadable knowledge index at {path}: {e}")
+            return None
+
+    def save(self, content_hash: str, entries: List[Dict], embeddings: np.ndarray, index,
+             embedder_name: str, signature: str) -> Optional[str]:
+        """Write an artifact atomically; returns its path, or None if the disk is unavailable"""
+        tmp_path = self.begin(content_hash)
+        if tmp_path is None:
+            return None
+        try:
+            np.save(os.path.join(tmp_path, self.EMBEDDINGS_FILE), np.ascontiguousarray(embeddings, dtype="float32"))
+        except OSError as e:
+            return self.abort(tmp_path, e)
+        return self.publish(tmp_path, content_hash, entries, embeddings, index, embedder_name, signature)
+
+    def begin(self, content_hash: str) -> Optional[str]:
+        """Create a private staging directory for a new artifact"""
+        tmp_path = f"{self.artifact_path(content_hash)}.tmp-{os.getpid()}"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+        except OSError as e:
+            return self.abort(tmp_path, e)
+        return tmp_path
+
+    def create_embeddings(self, tmp_path: str, rows: int, dimension: int) -> Optional[np.memmap]:
+        """Disk-backed embedding matrix inside a staging directory, filled in place"""
+        try:
+            return np.lib.format.open_memmap(os.path.join(tmp_path, self.EMBEDDINGS_FILE), mode="w+",
+                                             dtype="float32", shape=(rows, dimension))
+        except OSError as e:
+            return self.abort(tmp_path, e)
+
+    def publish(self, tmp_path: str, content_hash: str, entries: List[Dict], embeddings: np.ndarray, index,
+                embedder_name: str, signature: str) -> Optional[str]:
+        """Write the remaining files of a staged artifact and move it into place"""
+        final_path = self.artifact_path(content_hash)
+        try:
+            if isinstance(embeddings, np.memmap):
+                embeddings.flush()
+            with open(os.path.join(tmp_path, self.ENTRIES_FILE), "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            faiss.write_index(index, self.index_path(tmp_path, signature))
+
+            # Manifest goes last: its presence marks the artifact as complete
+            manifest = {
+                "format_version": self.FORMAT_VERSION,
+                "content_hash": content_hash,
+                "embedder": embedder_name,
+                "entries": len(entries),
+                "dimension": int(embeddings.shape[1])
+            }
+            with open(os.path.join(tmp_path, self.MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+            try:
+                os.rename(tmp_path, final_path)
+            except OSError:
+                # Another worker published the same artifact first
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            return final_path
+
+        except OSError as e:
+            return self.abort(tmp_path, e)
+
+    def save_index(self, content_hash: str, signature: str, index) -> bool:
+        """Add another index type to an existing artifact without touching its embeddings"""
+        path = self.index_path(self.artifact_path(content_hash), signature)
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            faiss.write_index(index, tmp_path)
+            os.replace(tmp_path, path)
+            return True
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Could not persist {signature} index to {self.index_dir}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def load_blob(self, content_hash: str, name: str):
+        """Load a derived structure (e.g. the lexical index) stored with an artifact"""
+        path = os.path.join(self.artifact_path(content_hash), f"{name}.pkl")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable {name} data at {path}: {e}")
+            return None
+
+    def save_blob(self, content_hash: str, name: str, value) -> bool:
+        """Store a derived structure next to an artifact's embeddings"""
+        artifact_path = self.artifact_path(content_hash)
+        if not os.path.isdir(artifact_path):
+            return False
+        path = os.path.join(artifact_path, f"{name}.pkl")
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not persist {name} data to {self.index_dir}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def load_array(self, content_hash: str, name: str) -> Optional[np.ndarray]:
+        """Memory-map a derived matrix (e.g. passage embeddings) stored with an artifact"""
+        path = os.path.join(self.artifact_path(content_hash), f"{name}.npy")
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable {name} data at {path}: {e}")
+            return None
+
+    def create_array(self, content_hash: str, name: str, shape) -> Optional[np.memmap]:
+        """Disk-backed float matrix next to an artifact, filled in place and then committed"""
+        artifact_path = self.artifact_path(content_hash)
+        if not os.path.isdir(artifact_path):
+            return None
+        try:
+            return np.lib.format.open_memmap(os.path.join(artifact_path, f"{name}.npy.tmp-{os.getpid()}"),
+                                             mode="w+", dtype="float32", shape=shape)
+        except OSError as e:
+            logger.warning(f"Could not persist {name} data to {self.index_dir}: {e}")
+            return None
+
+    def commit_array(self, content_hash: str, name: str, array: np.memmap) -> np.ndarray:
+        """Move a matrix from create_array into place; returns it mapped read-only"""
+        path = os.path.join(self.artifact_path(content_hash), f"{name}.npy")
+        array.flush()
+        try:
+            os.replace(array.filename, path)
+        except OSError as e:
+            logger.warning(f"Could not persist {name} data to {self.index_dir}: {e}")
+            return array
+        return np.load(path, mmap_mode="r")
+
+    def save_array(self, content_hash: str, name: str, array: np.ndarray) -> bool:
+        """Store a small derived array next to an artifact's embeddings"""
+        artifact_path = self.artifact_path(content_hash)
+        if not os.path.isdir(artifact_path):
+            return False
+        path = os.path.join(artifact_path, f"{name}.npy")
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not persist {name} data to {self.index_dir}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+    def abort(self, tmp_path: str, error: Exception) -> None:
+        logger.warning(f"Could not persist knowledge index to {self.index_dir}: {error}")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return None
+
+    def remove(self, content_hash: str):
+        """Delete one artifact, e.g. an update version that has been replaced"""
+        shutil.rmtree(self.artifact_path(content_hash), ignore_errors=True)
+
+    def prune(self, keep: List[str]):
+        """Remove artifacts built from older knowledge or embedder versions"""
+        keep_names = {os.path.basename(self.artifact_path(content_hash)) for content_hash in keep}
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return
+        for name in names:
+            is_artifact = len(name) == 16 and all(c in "0123456789abcdef" for c in name)
+            if is_artifact and name not in keep_names:
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+
+    def _read_index(self, path: str):
+        try:
+            return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type supports memory-mapping
+            return faiss.read_index(path)
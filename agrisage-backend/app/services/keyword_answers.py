@@ -0,0 +1,34 @@
+from typing import Dict, Optional
+
+# Simple knowledge base: no model or index needed, so it can answer while they load
+SIMPLE_ANSWERS = {
+    "wheat": "For wheat crop: Apply NPK in ratio 120:60:40 kg/hectare. Use DAP at sowing. Apply urea in 2-3 splits. Best sowing time: November 15 - December 15 in North India.",
+    "rice": "Rice requires 1200-1500mm annual rainfall. Transplant 25-30 day old seedlings. Apply 150:75:75 kg NPK/hectare. Harvest when 80-85% grains turn golden yellow.",
+    "cotton": "Use Bt cotton varieties for bollworm resistance. Install pheromone traps 5-10/hectare. Apply balanced NPK fertilizers. Control whitefly to prevent leaf curl virus.",
+    "fertilizer": "Apply balanced NPK fertilizers based on soil test. Use organic manure like FYM 10-15 tons/hectare. For organic farming, use vermicompost 5-8 tons/hectare.",
+    "pest": "Use Integrated Pest Management (IPM). Install pheromone traps. Use neem-based organic pesticides. Maintain field hygiene. Crop rotation helps break pest cycles.",
+    "crop": "Complete guide to crop cultivation: 1) Soil preparation with proper pH 2) Quality seed selection 3) Timely sowing 4) Balanced nutrition 5) Water management 6) Pest control 7) Proper harvesting",
+    "pm-kisan": "PM-KISAN provides ₹6000 per year to farmer families in 3 installments of ₹2000 each. Direct cash transfer to bank account. No land size restriction. Apply through pmkisan.gov.in"
+}
+
+DEFAULT_ANSWER = "I'm a simple agricultural assistant. For detailed guidance, consult local agricultural extension services or Krishi Vigyan Kendra."
+
+def match_simple_answer(question: str) -> Optional[str]:
+    """Answer of the first keyword contained in the question, if any"""
+    question = question.lower()
+    for keyword, answer in SIMPLE_ANSWERS.items():
+        if keyword in question:
+            return answer
+    return None
+
+def keyword_response(question: str) -> Dict:
+    """Orchestrator-shaped response from the keyword tier, served until the knowledge base is ready"""
+    answer = match_simple_answer(question)
+    return {
+        "response": answer or DEFAULT_ANSWER,
+        "confidence": 0.8 if answer else 0.3,
+        "model_used": "Simple Knowledge Base",
+        "source": "Agricultural Guidelines",
+        "cost": "FREE",
+        "success": True
+    }
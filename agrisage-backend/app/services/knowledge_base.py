@@ -1,18 +1,86 @@
-import json
-from typing import List, Dict
-from sentence_transformers import SentenceTransformer
-import faiss
+import copy
+import heapq
+import os
+import sys
+import logging
+from operator import attrgetter
+from typing import List, Dict, Optional, Callable
 import numpy as np
+import faiss
+from .index_store import KnowledgeIndexStore
+from .corpus_loader import count_corpus_entries, iter_corpus_chunks, normalize_entry
+from .ann_index import (COMPACT_STORAGE, DEFAULT_INDEX_TYPE, build_index, configure_search, create_index,
+                        enable_reconstruction, filtered_search, index_signature, requires_training,
+                        resolve_index_type)
+from .embedding_backends import create_embedder, embedder_identity
+from .memory import deep_sizeof, index_nbytes
+from .query_cache import QueryCache, normalize_query
+from .lexical_index import BM25Index, tokenize
+from .knowledge_store import KnowledgeStore, SearchResult
+from .passages import PASSAGE_INDEX, build_passage_index
+
+EMBEDDER_MODEL = 'all-MiniLM-L6-v2'
+# Render mounts the persistent disk declared in render.yaml at /data
+DEFAULT_INDEX_DIR = os.getenv("KB_INDEX_DIR", "/data/kb_index")
+# Optional JSONL/CSV corpus streamed into the index on top of the built-in entries
+DEFAULT_CORPUS_PATH = os.getenv("KB_CORPUS_PATH", "")
+INGEST_CHUNK_SIZE = int(os.getenv("KB_INGEST_CHUNK_SIZE", "2048"))
+INGEST_BATCH_SIZE = int(os.getenv("KB_INGEST_BATCH_SIZE", "64"))
+
+# Hybrid retrieval: share of the fused score that comes from BM25
+LEXICAL_WEIGHT = float(os.getenv("KB_LEXICAL_WEIGHT", "0.3"))
+# Lexical-only answers for queries an entry matches unambiguously (skips the embedder)
+LEXICAL_FAST_PATH = os.getenv("KB_LEXICAL_FAST_PATH", "true").lower() == "true"
+LEXICAL_FAST_PATH_MIN_TERMS = 2
+LEXICAL_FAST_PATH_MARGIN = 1.5
+LEXICAL_FAST_PATH_CONFIDENCE = 0.9
+
+# Metadata fields a search can be restricted to (e.g. crop=rice, language=hi)
+PARTITION_FIELDS = ("crop", "category", "language")
+# Partitions up to this size are scored exactly against their stored embeddings
+PARTITION_EXACT_LIMIT = int(os.getenv("KB_PARTITION_EXACT_LIMIT", "20000"))
+
+GENERAL_QUERIES = ["how to grow crops", "grow crops", "farming", "cultivation", "agriculture basics", "crop growing"]
+
+logger = logging.getLogger(__name__)
 
 class AgricultureKnowledgeBase:
-    def __init__(self):
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
-        self.setup_enhanced_knowledge()
-        self.build_search_index()
+    def __init__(self, index_dir: Optional[str] = None, corpus_path: Optional[str] = None,
+                 index_type: Optional[str] = None, compact: bool = COMPACT_STORAGE,
+                 embedder=None, version: Optional[str] = None, prune: bool = True):
+        self.configured_index_type = index_type or DEFAULT_INDEX_TYPE
+        self.compact = compact
+        # A reload hands over the running embedder instead of loading the model again
+        self.embedder = embedder if embedder is not None else create_embedder(EMBEDDER_MODEL)
+        # Part of the content hash, so vectors from another backend never mix with a stored index
+        self.embedder_name = embedder_identity(EMBEDDER_MODEL, self.embedder)
+        self.dimension = self.embedder.get_sentence_embedding_dimension()
+        self.index_store = KnowledgeIndexStore(index_dir or DEFAULT_INDEX_DIR)
+        self.query_cache = QueryCache()
+        self.corpus_path = corpus_path if corpus_path is not None else DEFAULT_CORPUS_PATH
+        # Search worker processes only map a published version; they never build, save or prune
+        self.read_only = version is not None
+        
+        if self.read_only:
+            if not self.load_version(version):
+                raise FileNotFoundError(f"Knowledge base version {version[:16]} is not published in "
+                                        f"{self.index_store.index_dir}")
+        else:
+            self.setup_enhanced_knowledge()
+            self.build_search_index()
+            
+            self.retained_versions = [self.index_version]
+            if self.corpus_path:
+                self.ingest_corpus(self.corpus_path)
+                self.retained_versions.append(self.index_version)
+            if prune:
+                self.index_store.prune(keep=self.retained_versions)
+        if self.compact:
+            self.drop_embeddings()
     
     def setup_enhanced_knowledge(self):
         """Comprehensive agricultural knowledge base"""
-        self.knowledge_base = [
+        entries = [
             {
                 "id": 0,
                 "question": "How to grow crops?",
@@ -131,50 +199,525 @@ class AgricultureKnowledgeBase:
                 "language": "en"
             }
         ]
+        self.knowledge_base = KnowledgeStore(entries)
     
     def build_search_index(self):
-        """Build FAISS index for semantic search"""
-        questions = [item['question'] for item in self.knowledge_base]
-        self.embeddings = self.embedder.encode(questions)
+        """Load the persisted FAISS index, or build and persist it if the knowledge changed"""
+        self.index_version = KnowledgeIndexStore.content_hash(self.knowledge_base.to_dicts(), self.embedder_name)
+        
+        artifact = self.index_store.load(self.index_version)
+        if artifact is not None:
+            # Memory-mapped: no re-encoding and no private copy of the vectors
+            self.embeddings = artifact['embeddings']
+            self._load_or_build_index()
+            self._load_or_build_lexical_index()
+            self._load_or_build_passages()
+            return
+        
+        self.embeddings = self.embedder.encode(self.knowledge_base.questions).astype('float32')
         
         # Create FAISS index
-        self.index = faiss.IndexFlatIP(self.embeddings.shape[1])
-        self.index.add(self.embeddings.astype('float32'))
+        self.index_type = resolve_index_type(self.configured_index_type, len(self.embeddings), self.compact)
+        self.index = build_index(self.embeddings, self.index_type)
+        
+        self.index_store.save(self.index_version, self.knowledge_base.to_dicts(), self.embeddings,
+                              self.index, self.embedder_name, self._index_signature(len(self.embeddings)))
+        self._load_or_build_lexical_index()
+        self._load_or_build_passages()
+    
+    def ingest_corpus(self, corpus_path: str, chunk_size: int = INGEST_CHUNK_SIZE,
+                      batch_size: int = INGEST_BATCH_SIZE,
+                      progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """Stream a JSONL/CSV corpus into the index chunk by chunk.
+        
+        Only one chunk of entries and its vectors are held at a time; the
+        embedding matrix is written straight into the on-disk artifact.
+        Returns the number of entries added.
+        """
+        corpus_version = KnowledgeIndexStore.corpus_hash(self.index_version, corpus_path)
+        base_rows = len(self.knowledge_base)
+        
+        artifact = self.index_store.load(corpus_version)
+        if artifact is not None:
+            added = len(artifact['entries']) - base_rows
+            self.knowledge_base = KnowledgeStore(artifact['entries'])
+            self.embeddings = artifact['embeddings']
+            self.index_version = corpus_version
+            self._load_or_build_index()
+            self._load_or_build_lexical_index()
+            self._load_or_build_passages()
+            logger.info(f"Loaded {added} corpus entries from the index artifact")
+            return added
+        
+        # Corpus ids must not shadow the entries already loaded
+        reserved_ids = set(self.knowledge_base.ids)
+        total = count_corpus_entries(corpus_path, reserved_ids)
+        dimension = self.embeddings.shape[1]
+        if progress is None:
+            progress = self._log_ingest_progress
+        
+        staging_path = self.index_store.begin(corpus_version)
+        embeddings = None
+        if staging_path is not None:
+            embeddings = self.index_store.create_embeddings(staging_path, base_rows + total, dimension)
+        if embeddings is None:
+            # No writable disk: keep the vectors in memory instead
+            embeddings = np.empty((base_rows + total, dimension), dtype='float32')
+        embeddings[:base_rows] = self.embeddings
+        
+        # Index types that need training are built once all vectors are known;
+        # the others grow chunk by chunk
+        index_type = resolve_index_type(self.configured_index_type, base_rows + total, self.compact)
+        index = None
+        if not requires_training(index_type):
+            index = create_index(index_type, dimension, base_rows + total)
+            index.add(np.ascontiguousarray(self.embeddings, dtype='float32'))
+        
+        row = base_rows
+        # Records without an id get one that neither the loaded entries nor the corpus itself use
+        for chunk in iter_corpus_chunks(corpus_path, chunk_size, reserved_ids, first_id=self._next_entry_id()):
+            vectors = self.embedder.encode([entry['question'] for entry in chunk],
+                                           batch_size=batch_size).astype('float32')
+            if index is not None:
+                index.add(vectors)
+            embeddings[row:row + len(chunk)] = vectors
+            self.lexical_index.add_entries(chunk)
+            self.knowledge_base.extend(chunk)
+            row += len(chunk)
+            progress(row - base_rows, total)
+        
+        self.embeddings = embeddings[:row]
+        if index is None:
+            index = build_index(self.embeddings, index_type)
+        configure_search(index)
+        self.index = index
+        self.index_type = index_type
+        self.index_version = corpus_version
+        if staging_path is not None and isinstance(embeddings, np.memmap):
+            self.index_store.publish(staging_path, corpus_version, self.knowledge_base.to_dicts(), embeddings,
+                                     self.index, self.embedder_name, self._index_signature(row))
+            self.index_store.save_blob(corpus_version, 'lexical', self.lexical_index)
+        self._build_partitions()
+        # The built-in entries keep their passage vectors; only corpus answers are encoded
+        self._load_or_build_passages(reuse_rows=np.arange(base_rows))
+        return row - base_rows
+    
+    def load_version(self, version: str) -> bool:
+        """Serve a published artifact as-is (entries, embeddings and indexes)"""
+        artifact = self.index_store.load(version)
+        if artifact is None:
+            return False
+        self.knowledge_base = KnowledgeStore(artifact['entries'])
+        self.embeddings = artifact['embeddings']
+        self.index_version = version
+        self.retained_versions = [version]
+        self._load_or_build_index()
+        self._load_or_build_lexical_index()
+        self._load_or_build_passages()
+        return True
+    
+    def reload(self, corpus_path: Optional[str] = None) -> 'AgricultureKnowledgeBase':
+        """Build a new knowledge base from a corpus file, reusing the loaded embedder.
+        
+        This instance is left untouched so searches can keep using it until
+        the caller swaps the new one in; its artifact is not pruned, since
+        search workers may still be mapping it.
+        """
+        return AgricultureKnowledgeBase(index_dir=self.index_store.index_dir,
+                                        corpus_path=corpus_path if corpus_path is not None else self.corpus_path,
+                                        index_type=self.configured_index_type, compact=self.compact,
+                                        embedder=self.embedder, prune=False)
+    
+    def update_entries(self, add: Optional[List[Dict]] = None,
+                       remove_ids: Optional[List] = None) -> 'AgricultureKnowledgeBase':
+        """Copy of this knowledge base with entries added, replaced (same id) or removed.
+        
+        Only the added entries (questions and answer passages) are encoded.
+        Adds extend a copy of the index; removals rebuild the index from the
+        stored vectors of the remaining entries. This instance keeps serving
+        searches unchanged, and its artifact stays on disk until the caller
+        retires it (see is_update_version).
+        """
+        added = [normalize_entry(raw) for raw in add or []]
+        if any(entry is None for entry in added):
+            raise ValueError("Every added entry needs a question and an answer")
+        next_id = self._next_entry_id()
+        for entry in added:
+            if 'id' not in entry:
+                entry['id'] = next_id
+                next_id += 1
+        
+        replaced = set(remove_ids or []) | {entry['id'] for entry in added}
+        keep_rows = np.array([row for row, entry_id in enumerate(self.knowledge_base.ids)
+                              if entry_id not in replaced], dtype='int64')
+        removed = len(self.knowledge_base) - len(keep_rows)
+        entries = self.knowledge_base.select(keep_rows)
+        entries.extend(added)
+        entry_dicts = entries.to_dicts()
+        version = KnowledgeIndexStore.content_hash(entry_dicts, self.embedder_name)
+        num_entries = len(entries)
+        
+        staging_path = self.index_store.begin(version)
+        embeddings = None
+        if staging_path is not None:
+            embeddings = self.index_store.create_embeddings(staging_path, num_entries, self.dimension)
+        if embeddings is None:
+            embeddings = np.empty((num_entries, self.dimension), dtype='float32')
+        # Kept rows are copied as float vectors: in compact mode from the artifact on disk (or
+        # re-encoded), never decoded from index codes, which would compound quantization error
+        source = self.embeddings
+        if source is None:
+            source = self.index_store.load_embeddings(self.index_version)
+        for start in range(0, len(keep_rows), INGEST_CHUNK_SIZE):
+            rows = keep_rows[start:start + INGEST_CHUNK_SIZE]
+            if source is not None:
+                embeddings[start:start + len(rows)] = source[rows]
+            else:
+                embeddings[start:start + len(rows)] = self.embedder.encode(
+                    [self.knowledge_base.questions[row] for row in rows], batch_size=INGEST_BATCH_SIZE)
+        new_vectors = np.empty((0, self.dimension), dtype='float32')
+        if added:
+            new_vectors = self.embedder.encode([entry['question'] for entry in added],
+                                               batch_size=INGEST_BATCH_SIZE).astype('float32')
+            embeddings[len(keep_rows):] = new_vectors
+        
+        index_type = resolve_index_type(self.configured_index_type, num_entries, self.compact)
+        if removed == 0 and index_type == self.index_type:
+            index = faiss.clone_index(self.index)
+            index.add(new_vectors)
+            lexical_index = self.lexical_index.copy()
+        else:
+            index = build_index(embeddings, index_type)
+            lexical_index = self.lexical_index.subset(keep_rows)
+        configure_search(index)
+        lexical_index.add_entries(added)
+        
+        if staging_path is not None and isinstance(embeddings, np.memmap):
+            self.index_store.publish(staging_path, version, entry_dicts, embeddings, index,
+                                     self.embedder_name, index_signature(index_type, num_entries, self.dimension))
+            self.index_store.save_blob(version, 'lexical', lexical_index)
+        
+        updated = copy.copy(self)
+        updated.knowledge_base = entries
+        updated.embeddings = embeddings
+        updated.index = index
+        updated.index_type = index_type
+        updated.index_version = version
+        updated.lexical_index = lexical_index
+        updated.query_cache = QueryCache()
+        updated._build_partitions()
+        updated._load_or_build_passages(reuse_rows=keep_rows, reuse_version=self.index_version)
+        if self.compact:
+            updated.drop_embeddings()
+        logger.info(f"Knowledge base updated to {version[:16]}: {len(added)} entries added or replaced, "
+                    f"{removed} old entries dropped, {num_entries} total")
+        return updated
+    
+    @property
+    def is_update_version(self) -> bool:
+        """Whether this version came from update_entries (the base and corpus artifacts are kept for restarts)"""
+        return self.index_version not in self.retained_versions
+
+    def _index_signature(self, num_entries: int) -> str:
+        index_type = resolve_index_type(self.configured_index_type, num_entries, self.compact)
+        return index_signature(index_type, num_entries, self.dimension)
+    
+    def drop_embeddings(self):
+        """Release the float matrix and serve stored vectors from the (compressed) index.
+        
+        The matrix stays in the artifact on disk, where update_entries reads
+        it back; in memory only the index codes remain.
+        """
+        if self.embeddings is None:
+            return
+        enable_reconstruction(self.index)
+        self.embeddings = None
+        if self.passages is not None:
+            self.passages.drop_embeddings()
+        logger.info(f"Compact storage: float embeddings released, serving {self.index_type} index codes")
+    
+    def stored_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Float vectors of the given rows, decoded from the index in compact mode"""
+        if self.embeddings is not None:
+            return np.ascontiguousarray(self.embeddings[rows], dtype='float32')
+        return self.index.reconstruct_batch(np.asarray(rows, dtype='int64'))
+    
+    def _load_or_build_index(self):
+        """Map the artifact's index of the configured type, building it from the mapped embeddings if missing"""
+        num_entries = len(self.embeddings)
+        self.index_type = resolve_index_type(self.configured_index_type, num_entries, self.compact)
+        signature = self._index_signature(num_entries)
+        
+        index = self.index_store.load_index(self.index_version, signature)
+        if index is None:
+            if self.read_only:
+                raise FileNotFoundError(f"No {signature} index in knowledge base version {self.index_version[:16]}")
+            index = build_index(self.embeddings, self.index_type)
+            self.index_store.save_index(self.index_version, signature, index)
+        self.index = configure_search(index)
+    
+    def _load_or_build_lexical_index(self):
+        """BM25 index over questions, keywords and answers, persisted with the artifact"""
+        lexical_index = self.index_store.load_blob(self.index_version, 'lexical')
+        if lexical_index is None or lexical_index.num_docs != len(self.knowledge_base):
+            if self.read_only:
+                raise FileNotFoundError(f"No lexical index in knowledge base version {self.index_version[:16]}")
+            lexical_index = BM25Index()
+            lexical_index.add_entries(self.knowledge_base)
+            self.index_store.save_blob(self.index_version, 'lexical', lexical_index)
+        self.lexical_index = lexical_index
+        self._build_partitions()
+    
+    def _load_or_build_passages(self, reuse_rows: Optional[np.ndarray] = None,
+                                reuse_version: Optional[str] = None):
+        """Answer passage index, persisted with the artifact.
+        
+        reuse_rows are the rows of the current passage index (of version
+        reuse_version) that the new entries start with; their passage vectors
+        are copied, not re-encoded.
+        """
+        previous = getattr(self, 'passages', None) if reuse_rows is not None else None
+        self.passages = None
+        if PASSAGE_INDEX:
+            self.passages = build_passage_index(self.knowledge_base.answers, self.embedder, self.index_store,
+                                                self.index_version, self.configured_index_type,
+                                                compact=self.compact, batch_size=INGEST_BATCH_SIZE, reuse=previous,
+                                                reuse_rows=reuse_rows, reuse_version=reuse_version,
+                                                read_only=self.read_only)
+    
+    def _build_partitions(self):
+        """Row lists per crop, category and language value, for filtered search"""
+        self.partitions = {}
+        for field in PARTITION_FIELDS:
+            # Values that only differ in case or spacing share a partition
+            tag_values = [value.strip().lower() for value in self.knowledge_base.tag_values[field]]
+            names = list(dict.fromkeys(tag_values))
+            name_positions = {name: position for position, name in enumerate(names)}
+            code_names = np.array([name_positions[value] for value in tag_values], dtype='int64')
+            keys = code_names[self.knowledge_base.tag_codes(field)]
+            order = np.argsort(keys, kind='stable')
+            groups = np.split(order, np.flatnonzero(np.diff(keys[order])) + 1)
+            self.partitions[field] = {names[keys[group[0]]]: group for group in groups if len(group)}
+        general_rows = self.partitions['category'].get('general_farming')
+        self.general_farming_row = int(general_rows[0]) if general_rows is not None else None
+    
+    def partition_values(self, field: str) -> List[str]:
+        """Distinct values of a metadata field, e.g. the crops a picker can offer"""
+        return sorted(self.partitions.get(field, {}))
+    
+    def partition_rows(self, filters: Optional[Dict[str, str]]) -> Optional[np.ndarray]:
+        """Sorted rows matching every filter, or None when the search is unrestricted"""
+        rows = None
+        for field, value in (filters or {}).items():
+            if value is None or value == '':
+                continue
+            if field not in PARTITION_FIELDS:
+                raise ValueError(f"Cannot filter knowledge search by '{field}' "
+                                 f"(expected one of {', '.join(PARTITION_FIELDS)})")
+            matched = self.partitions[field].get(str(value).strip().lower(), np.empty(0, dtype='int64'))
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        return rows
+    
+    def _next_entry_id(self) -> int:
+        numeric_ids = [entry_id for entry_id in self.knowledge_base.ids if isinstance(entry_id, (int, float))]
+        return int(max(numeric_ids, default=-1)) + 1
+    
+    def _log_ingest_progress(self, done: int, total: int):
+        percent = 100.0 * done / total if total else 100.0
+        logger.info(f"Ingested {done}/{total} corpus entries ({percent:.1f}%)")
     
-    def search_knowledge(self, query: str, top_k: int = 3) -> List[Dict]:
+    def search_knowledge(self, query: str, top_k: int = 3,
+                         filters: Optional[Dict[str, str]] = None) -> List[SearchResult]:
         """Enhanced search for relevant answers"""
-        query_embedding = self.embedder.encode([query])
-        scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        return self.search_knowledge_batch([query], top_k, filters)[0]
+    
+    def search_knowledge_batch(self, queries: List[str], top_k: int = 3,
+                               filters: Optional[Dict[str, str]] = None) -> List[List[SearchResult]]:
+        """Search several queries with one embedder forward pass and one index search.
         
-        results = []
+        Repeated questions are answered from the query cache, including the
+        ones the lexical fast path answered; a cached vector is reused when
+        only a deeper top_k is needed. filters (crop, category, language)
+        restrict every query of the batch to one metadata partition.
+        """
+        rows = self.partition_rows(filters)
+        if rows is not None and len(rows) == 0:
+            return [[] for _ in queries]
         
-        # Check for exact keyword matches first
+        results: List[Optional[List[SearchResult]]] = [None] * len(queries)
+        scope = ''
+        if rows is not None:
+            scope = '|' + ','.join(f"{field}={str(value).strip().lower()}"
+                                   for field, value in sorted(filters.items()) if value)
+        keys = [normalize_query(query) + scope for query in queries]
+        vectors: List[Optional[np.ndarray]] = [None] * len(queries)
+        
+        for row, key in enumerate(keys):
+            cached = self.query_cache.get(key, self.index_version)
+            if cached is None:
+                continue
+            if cached.top_k >= top_k:
+                results[row] = cached.results[:top_k]
+            else:
+                # None for lexical fast path results, which were found without a vector
+                vectors[row] = cached.vector
+        
+        if LEXICAL_FAST_PATH:
+            for row, query in enumerate(queries):
+                if results[row] is None and vectors[row] is None:
+                    results[row] = self._lexical_fast_path(query, top_k, rows)
+                    if results[row] is not None:
+                        self.query_cache.put(keys[row], self.index_version, None, results[row], top_k)
+        
+        to_encode = [row for row in range(len(queries)) if results[row] is None and vectors[row] is None]
+        if to_encode:
+            encoded = self.embedder.encode([queries[row] for row in to_encode]).astype('float32')
+            for row, vector in zip(to_encode, encoded):
+                vectors[row] = vector
+        
+        to_search = [row for row in range(len(queries)) if results[row] is None]
+        if to_search:
+            query_embeddings = np.stack([vectors[i] for i in to_search])
+            if rows is None:
+                scores, indices = self.index.search(query_embeddings, top_k)
+            elif len(rows) <= PARTITION_EXACT_LIMIT and self.embeddings is not None:
+                scores, indices = self._search_partition_exact(query_embeddings, rows, top_k)
+            else:
+                scores, indices = filtered_search(self.index, query_embeddings, top_k, rows)
+            # Passage hits are filtered to the partition afterwards, in _collect_results
+            passage_hits = (self.passages.search(query_embeddings, top_k) if self.passages is not None
+                            else [{} for _ in to_search])
+            for position, row in enumerate(to_search):
+                results[row] = self._collect_results(queries[row], vectors[row], scores[position],
+                                                     indices[position], top_k, rows, passage_hits[position])
+                self.query_cache.put(keys[row], self.index_version, vectors[row], results[row], top_k)
+        
+        return results
+    
+    def _search_partition_exact(self, query_embeddings: np.ndarray, rows: np.ndarray, top_k: int):
+        """Exact inner-product search over a small partition, shaped like index.search output"""
+        partition_scores = query_embeddings @ self.stored_vectors(rows).T
+        k = min(top_k, len(rows))
+        best = np.argpartition(-partition_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(partition_scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        
+        scores = np.full((len(query_embeddings), top_k), -np.inf, dtype='float32')
+        indices = np.full((len(query_embeddings), top_k), -1, dtype='int64')
+        scores[:, :k] = np.take_along_axis(best_scores, order, axis=1)
+        indices[:, :k] = rows[np.take_along_axis(best, order, axis=1)]
+        return scores, indices
+    
+    @staticmethod
+    def _in_partition(row: int, rows: Optional[np.ndarray]) -> bool:
+        if rows is None:
+            return True
+        position = np.searchsorted(rows, row)
+        return position < len(rows) and rows[position] == row
+    
+    def _is_general_query(self, query: str) -> bool:
         query_lower = query.lower()
-        general_queries = ["how to grow crops", "grow crops", "farming", "cultivation", "agriculture basics", "crop growing"]
+        return any(general_term in query_lower for general_term in GENERAL_QUERIES)
+    
+    def _lexical_fast_path(self, query: str, top_k: int,
+                           rows: Optional[np.ndarray] = None) -> Optional[List[SearchResult]]:
+        """Answer from BM25 alone when one entry contains every query term and clearly leads"""
+        if self._is_general_query(query) or len(tokenize(query)) < LEXICAL_FAST_PATH_MIN_TERMS:
+            return None
+        
+        hits = self.lexical_index.search(query, top_k=max(top_k, 2), allowed_rows=rows)
+        if not hits or hits[0]['coverage'] < 0.999:
+            return None
+        if len(hits) > 1 and hits[0]['bm25'] < LEXICAL_FAST_PATH_MARGIN * hits[1]['bm25']:
+            return None
         
-        if any(general_term in query_lower for general_term in general_queries):
+        top_bm25 = hits[0]['bm25']
+        results = []
+        for hit in hits:
+            lexical_score = hit['coverage'] * hit['bm25'] / top_bm25
+            results.append(SearchResult(self.knowledge_base, hit['row'], similarity_score=lexical_score,
+                                        confidence=LEXICAL_FAST_PATH_CONFIDENCE * lexical_score,
+                                        lexical_score=lexical_score))
+        # Coverage scales the confidence, so BM25 order is not confidence order
+        return heapq.nlargest(top_k, results, key=attrgetter('confidence'))
+    
+    def _collect_results(self, query: str, query_vector: np.ndarray, scores: np.ndarray,
+                         indices: np.ndarray, top_k: int, rows: Optional[np.ndarray] = None,
+                         passage_hits: Optional[Dict[int, float]] = None) -> List[SearchResult]:
+        """Rank candidate entries from the question, passage and BM25 indexes.
+        
+        An entry scores the better of its question similarity and its best
+        answer passage similarity; lexical evidence can only raise it. Results
+        are views onto the knowledge store rows, not copies of the entries.
+        """
+        results = []
+        seen_ids = set()
+        
+        # Check for exact keyword matches first
+        if (self.general_farming_row is not None and self._in_partition(self.general_farming_row, rows)
+                and self._is_general_query(query)):
             # Prioritize general farming knowledge for broad queries
-            for item in self.knowledge_base:
-                if item.get('category') == 'general_farming':
-                    results.append({
-                        **item,
-                        'similarity_score': 0.95,
-                        'confidence': 0.95
-                    })
-                    break
-        
-        # Add semantic search results
-        for score, idx in zip(scores[0], indices[0]):
-            if idx < len(self.knowledge_base):
-                item = self.knowledge_base[idx]
-                # Avoid duplicates
-                if not any(r['id'] == item['id'] for r in results):
-                    results.append({
-                        **item,
-                        'similarity_score': float(score),
-                        'confidence': min(float(score * 1.2), 1.0)  # Boost confidence slightly
-                    })
-        
-        # Sort by confidence and return top results
-        results.sort(key=lambda x: x['confidence'], reverse=True)
-        return results[:top_k]
\ No newline at end of file
+            results.append(SearchResult(self.knowledge_base, self.general_farming_row,
+                                        similarity_score=0.95, confidence=0.95))
+            seen_ids.add(self.knowledge_base.ids[self.general_farming_row])
+        
+        # Semantic candidates from the vector index
+        candidates = {}
+        for score, idx in zip(scores, indices):
+            # ANN indexes pad with -1 when fewer than top_k neighbours are found
+            if 0 <= idx < len(self.knowledge_base):
+                candidates[int(idx)] = float(score)
+        
+        # Lexical candidates from BM25; score them against the query vector too
+        lexical_hits = self.lexical_index.search(query, top_k, allowed_rows=rows)
+        top_bm25 = lexical_hits[0]['bm25'] if lexical_hits else 0.0
+        lexical_scores = {hit['row']: hit['coverage'] * hit['bm25'] / top_bm25 for hit in lexical_hits}
+        # Entries found through an answer passage or BM25 get their question scored too
+        passage_rows = [row for row in passage_hits or {} if self._in_partition(row, rows)]
+        unscored = np.array([row for row in dict.fromkeys([*lexical_scores, *passage_rows])
+                             if row not in candidates], dtype='int64')
+        if len(unscored):
+            for row, score in zip(unscored, self.stored_vectors(unscored) @ query_vector):
+                candidates[int(row)] = float(score)
+        
+        passage_scores = {}
+        if self.passages is not None and candidates:
+            candidate_rows = np.fromiter(candidates, dtype='int64', count=len(candidates))
+            passage_scores = dict(zip(candidates, self.passages.max_scores(candidate_rows, query_vector).tolist()))
+        
+        entry_ids = self.knowledge_base.ids
+        for row, question_score in candidates.items():
+            # Avoid duplicates
+            if entry_ids[row] in seen_ids:
+                continue
+            seen_ids.add(entry_ids[row])
+            
+            passage_score = max(passage_scores.get(row, 0.0), 0.0)
+            score = max(question_score, passage_score)
+            confidence = min(score * 1.2, 1.0)  # Boost confidence slightly
+            lexical_score = lexical_scores.get(row, 0.0)
+            if lexical_score:
+                # Lexical evidence can raise a match's confidence, never lower it
+                fused = (1.0 - LEXICAL_WEIGHT) * score + LEXICAL_WEIGHT * lexical_score
+                confidence = max(confidence, min(fused * 1.2, 1.0))
+            results.append(SearchResult(self.knowledge_base, row, similarity_score=score, confidence=confidence,
+                                        lexical_score=lexical_score, passage_score=passage_score))
+        
+        # Top results by confidence
+        return heapq.nlargest(top_k, results, key=attrgetter('confidence'))
+    
+    def memory_usage(self) -> Dict:
+        """Approximate bytes held by each component of the knowledge base"""
+        embeddings_mapped = isinstance(self.embeddings, np.memmap)
+        embeddings_bytes = int(self.embeddings.nbytes) if self.embeddings is not None else 0
+        return {
+            "embedder": self.embedder.nbytes(),
+            "index": index_nbytes(self.index),
+            # Memory-mapped embeddings live in the page cache, not the heap
+            "embeddings": 0 if embeddings_mapped else embeddings_bytes,
+            "embeddings_mapped": embeddings_bytes if embeddings_mapped else 0,
+            "entries": self.knowledge_base.nbytes(),
+            "lexical_index": deep_sizeof(self.lexical_index.postings) + sys.getsizeof(self.lexical_index.doc_lengths),
+            "passages": self.passages.nbytes() if self.passages is not None else 0,
+            "passages_mapped": self.passages.mapped_nbytes() if self.passages is not None else 0
+        }
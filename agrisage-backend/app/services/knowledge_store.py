@@ -0,0 +1,144 @@
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Sequence
+
+import numpy as np
+
+ENTRY_FIELDS = ("id", "question", "answer", "keywords", "category", "crop", "language")
+# Low-cardinality fields, stored as codes into a per-field value list
+TAG_FIELDS = ("category", "crop", "language")
+SCORE_FIELDS = ("similarity_score", "lexical_score", "passage_score", "confidence")
+
+class KnowledgeStore:
+    """Knowledge base entries in parallel columns, addressed by row.
+
+    Questions and answers are kept once (identical answers share one
+    string), tags are small integer codes, and entry() / SearchResult give
+    read-only views of a row instead of per-search dict copies.
+    """
+    def __init__(self, entries: Iterable[Dict] = ()):
+        self.ids: List = []
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self.keywords: List[tuple] = []
+        self.tag_values: Dict[str, List[str]] = {field: [] for field in TAG_FIELDS}
+        self._tag_codes: Dict[str, array] = {field: array("I") for field in TAG_FIELDS}
+        self._tag_lookup: Dict[str, Dict[str, int]] = {field: {} for field in TAG_FIELDS}
+        self._answer_pool: Dict[str, str] = {}
+        self.extend(entries)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, row: int) -> "KnowledgeEntry":
+        if not -len(self.ids) <= row < len(self.ids):
+            raise IndexError(f"knowledge row {row} out of range")
+        return KnowledgeEntry(self, row % len(self.ids))
+
+    def __iter__(self) -> Iterator["KnowledgeEntry"]:
+        return (KnowledgeEntry(self, row) for row in range(len(self.ids)))
+
+    def extend(self, entries: Iterable[Dict]):
+        """Append entries (dicts or views of another store) as the next rows"""
+        for entry in entries:
+            self.ids.append(entry.get("id"))
+            self.questions.append(entry["question"])
+            answer = entry["answer"]
+            self.answers.append(self._answer_pool.setdefault(answer, answer))
+            self.keywords.append(tuple(entry.get("keywords") or ()))
+            for field in TAG_FIELDS:
+                value = str(entry.get(field, ""))
+                code = self._tag_lookup[field].get(value)
+                if code is None:
+                    code = self._tag_lookup[field][value] = len(self.tag_values[field])
+                    self.tag_values[field].append(value)
+                self._tag_codes[field].append(code)
+
+    def select(self, rows: Sequence[int]) -> "KnowledgeStore":
+        """New store holding the given rows in order; the strings are shared, not copied"""
+        return KnowledgeStore(KnowledgeEntry(self, int(row)) for row in rows)
+
+    def value(self, row: int, field: str):
+        if field == "id":
+            return self.ids[row]
+        if field == "question":
+            return self.questions[row]
+        if field == "answer":
+            return self.answers[row]
+        if field == "keywords":
+            return list(self.keywords[row])
+        if field in self._tag_codes:
+            return self.tag_values[field][self._tag_codes[field][row]]
+        raise KeyError(field)
+
+    def tag_codes(self, field: str) -> np.ndarray:
+        """Per-row codes of a tag field, indexing tag_values[field]"""
+        return np.frombuffer(self._tag_codes[field], dtype=np.uint32)
+
+    def entry(self, row: int) -> Dict:
+        return {field: self.value(row, field) for field in ENTRY_FIELDS}
+
+    def to_dicts(self) -> List[Dict]:
+        """Plain entries, for hashing and for the artifact's entries.json"""
+        return [self.entry(row) for row in range(len(self.ids))]
+
+    def nbytes(self) -> int:
+        """Approximate bytes held by the columns, counting each shared string once"""
+        columns = (self.ids, self.questions, self.answers, self.keywords)
+        size = sum(sys.getsizeof(column) for column in columns)
+        size += sum(sys.getsizeof(value) for value in self.ids)
+        size += sum(sys.getsizeof(question) for question in self.questions)
+        size += sum(sys.getsizeof(answer) for answer in self._answer_pool)
+        size += sum(sys.getsizeof(keywords) + sum(sys.getsizeof(keyword) for keyword in keywords)
+                    for keywords in self.keywords)
+        size += sum(codes.itemsize * len(codes) for codes in self._tag_codes.values())
+        return size
+
+class KnowledgeEntry(Mapping):
+    """Read-only view of one knowledge base row, usable like the entry dict"""
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: KnowledgeStore, row: int):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key: str):
+        return self.store.value(self.row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(ENTRY_FIELDS)
+
+    def __len__(self) -> int:
+        return len(ENTRY_FIELDS)
+
+    def __reduce__(self):
+        # Crossing a process boundary materializes the row instead of pickling the whole store
+        return (dict, (dict(self),))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+class SearchResult(KnowledgeEntry):
+    """A knowledge base row plus the scores one search gave it"""
+    __slots__ = SCORE_FIELDS
+
+    def __init__(self, store: KnowledgeStore, row: int, similarity_score: float, confidence: float,
+                 lexical_score: float = 0.0, passage_score: float = 0.0):
+        super().__init__(store, row)
+        self.similarity_score = similarity_score
+        self.lexical_score = lexical_score
+        self.passage_score = passage_score
+        self.confidence = confidence
+
+    def __getitem__(self, key: str):
+        if key in SCORE_FIELDS:
+            return getattr(self, key)
+        return self.store.value(self.row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from ENTRY_FIELDS
+        yield from SCORE_FIELDS
+
+    def __len__(self) -> int:
+        return len(ENTRY_FIELDS) + len(SCORE_FIELDS)
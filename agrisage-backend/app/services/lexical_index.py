@@ -0,0 +1,147 @@
+import math
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Latin words/numbers and Devanagari words, including their vowel signs and viramas
+TOKEN_PATTERN = re.compile(r"[0-9a-z\u0900-\u0963\u0966-\u097F]+")
+
+STOPWORDS = {
+    # English
+    "a", "an", "the", "is", "are", "was", "be", "to", "of", "in", "on", "for", "and", "or",
+    "my", "i", "me", "we", "our", "your", "it", "its", "this", "that", "with", "at", "by",
+    "how", "what", "which", "when", "why", "do", "does", "should", "can", "best", "about",
+    # Hindi
+    "का", "की", "के", "को", "में", "से", "है", "हैं", "हो", "रही", "रहा", "क्या", "कैसे",
+    "और", "या", "मेरी", "मेरा", "मेरे", "पर", "लिए", "चाहिए", "करना", "करें"
+}
+
+# Field weights: a term in the question or keywords counts more than one in the answer
+QUESTION_WEIGHT = 3
+KEYWORD_WEIGHT = 3
+ANSWER_WEIGHT = 1
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """Okapi BM25 inverted index over entry questions, keywords and answers.
+
+    Postings are kept in compact typed arrays and can be extended chunk by
+    chunk, matching how the vector index is built during corpus ingestion.
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[array, array]] = {}
+        self.doc_lengths = array("f")
+        self.total_length = 0.0
+
+    @property
+    def num_docs(self) -> int:
+        return len(self.doc_lengths)
+
+    def add_entries(self, entries: Iterable[Dict]):
+        """Index entries as the next rows, in knowledge base order"""
+        for entry in entries:
+            row = self.num_docs
+            term_counts: Dict[str, float] = {}
+            fields = (
+                (entry.get("question", ""), QUESTION_WEIGHT),
+                (" ".join(entry.get("keywords", [])), KEYWORD_WEIGHT),
+                (entry.get("answer", ""), ANSWER_WEIGHT),
+            )
+            for text, weight in fields:
+                for token in tokenize(text):
+                    term_counts[token] = term_counts.get(token, 0.0) + weight
+
+            length = sum(term_counts.values())
+            self.doc_lengths.append(length)
+            self.total_length += length
+            for term, count in term_counts.items():
+                rows, counts = self.postings.setdefault(term, (array("i"), array("f")))
+                rows.append(row)
+                counts.append(count)
+
+    def copy(self) -> "BM25Index":
+        """Independent copy that can be extended while this one keeps serving searches"""
+        clone = BM25Index(self.k1, self.b)
+        clone.postings = {term: (array("i", rows), array("f", counts))
+                          for term, (rows, counts) in self.postings.items()}
+        clone.doc_lengths = array("f", self.doc_lengths)
+        clone.total_length = self.total_length
+        return clone
+
+    def subset(self, keep_rows: np.ndarray) -> "BM25Index":
+        """Copy holding only the given (sorted) rows, renumbered 0..len(keep_rows)-1"""
+        keep = np.zeros(self.num_docs, dtype=bool)
+        keep[keep_rows] = True
+        new_row = np.cumsum(keep, dtype=np.int64) - 1
+
+        clone = BM25Index(self.k1, self.b)
+        for term, (rows, counts) in self.postings.items():
+            rows = np.frombuffer(rows, dtype=np.int32)
+            mask = keep[rows]
+            if mask.any():
+                clone.postings[term] = (array("i", new_row[rows[mask]].astype(np.int32).tobytes()),
+                                        array("f", np.frombuffer(counts, dtype=np.float32)[mask].tobytes()))
+        lengths = np.frombuffer(self.doc_lengths, dtype=np.float32)[keep]
+        clone.doc_lengths = array("f", lengths.tobytes())
+        clone.total_length = float(lengths.sum())
+        return clone
+
+    def idf(self, term: str) -> float:
+        """Inverse document frequency; a term no entry contains gets the highest idf"""
+        postings = self.postings.get(term)
+        df = len(postings[0]) if postings is not None else 0
+        return math.log(1.0 + (self.num_docs - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, top_k: int = 3, allowed_rows: Optional[np.ndarray] = None) -> List[Dict]:
+        """Top rows by BM25, with the idf-weighted share of query terms each row matches.
+
+        allowed_rows (sorted) restricts the result to a metadata partition.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.num_docs:
+            return []
+
+        avg_length = self.total_length / self.num_docs
+        doc_lengths = np.frombuffer(self.doc_lengths, dtype=np.float32)
+        # Unknown terms still count towards the total, so a query is only fully
+        # covered when every one of its terms occurs in the entry
+        total_idf = sum(self.idf(term) for term in terms)
+
+        all_rows, all_scores, all_idf = [], [], []
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            rows = np.frombuffer(postings[0], dtype=np.int32)
+            counts = np.frombuffer(postings[1], dtype=np.float32)
+            idf = self.idf(term)
+            norm = self.k1 * (1.0 - self.b + self.b * doc_lengths[rows] / avg_length)
+            all_rows.append(rows)
+            all_scores.append(idf * counts * (self.k1 + 1.0) / (counts + norm))
+            all_idf.append(np.full(len(rows), idf, dtype=np.float32))
+
+        if not all_rows:
+            return []
+
+        rows = np.concatenate(all_rows)
+        scores = np.concatenate(all_scores)
+        idfs = np.concatenate(all_idf)
+
+        unique_rows, inverse = np.unique(rows, return_inverse=True)
+        bm25 = np.bincount(inverse, weights=scores)
+        coverage = np.bincount(inverse, weights=idfs) / total_idf
+        if allowed_rows is not None:
+            keep = np.isin(unique_rows, allowed_rows, assume_unique=True)
+            unique_rows, bm25, coverage = unique_rows[keep], bm25[keep], coverage[keep]
+
+        order = np.argsort(-bm25)[:top_k]
+        return [
+            {"row": int(unique_rows[i]), "bm25": float(bm25[i]), "coverage": float(coverage[i])}
+            for i in order
+        ]
@@ -0,0 +1,58 @@
+import os
+import resource
+import sys
+from typing import Dict
+
+def process_memory() -> Dict:
+    """Current and peak resident memory of this worker process, in bytes"""
+    usage = {"rss_bytes": None, "peak_rss_bytes": None}
+
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        usage["rss_bytes"] = resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    usage["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    return usage
+
+def deep_sizeof(obj, _seen=None) -> int:
+    """Approximate memory held by plain Python containers (dicts, lists, strings)"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, _seen) + deep_sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, _seen) for item in obj)
+    return size
+
+def index_nbytes(index) -> int:
+    """Approximate size of the vectors stored in a FAISS index"""
+    if index is None:
+        return 0
+    code_size = getattr(index, "code_size", None)
+    storage = getattr(index, "storage", None)
+    if code_size is None and storage is not None:
+        # HNSW keeps its vectors in a flat or scalar-quantized storage index
+        import faiss
+        code_size = getattr(faiss.downcast_index(storage), "code_size", None)
+    if code_size is None:
+        code_size = index.d * 4
+    return int(index.ntotal * code_size)
+
+def model_nbytes(model) -> int:
+    """Size of a torch model's parameters and buffers"""
+    total = 0
+    for tensors in (getattr(model, "parameters", None), getattr(model, "buffers", None)):
+        if tensors is None:
+            continue
+        total += sum(t.numel() * t.element_size() for t in tensors())
+    return total
@@ -0,0 +1,208 @@
+import logging
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .ann_index import (COMPACT_STORAGE, build_index, configure_search, enable_reconstruction, index_signature,
+                        resolve_index_type)
+from .memory import index_nbytes
+
+logger = logging.getLogger(__name__)
+
+# Embed answer passages into a second index next to the question index
+PASSAGE_INDEX = os.getenv("KB_PASSAGE_INDEX", "true").lower() == "true"
+# Word budget per passage; MiniLM truncates at 256 word pieces, and short passages embed more sharply
+PASSAGE_MAX_TOKENS = int(os.getenv("KB_PASSAGE_MAX_TOKENS", "64"))
+# Passage hits fetched per wanted entry, since several passages of one entry can match
+PASSAGE_OVERFETCH = 4
+ENCODE_CHUNK_SIZE = 4096
+
+# "1) Soil Preparation: ... 2) Seed Selection: ..." step markers in answers
+STEP_PATTERN = re.compile(r"(?:^|\s)\d{1,2}\)\s+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?।])\s+")
+MARKUP_PATTERN = re.compile(r"\*\*")
+# Words of an answer's lead-in ("For wheat crop:") repeated in front of each step
+PREAMBLE_WORDS = 12
+
+def split_answer(answer: str, max_tokens: int = PASSAGE_MAX_TOKENS) -> List[str]:
+    """Split an answer on its numbered steps, or into sentence groups of at most max_tokens words"""
+    text = MARKUP_PATTERN.sub("", answer).strip()
+    markers = list(STEP_PATTERN.finditer(text))
+
+    if len(markers) >= 2:
+        preamble = " ".join(text[:markers[0].start()].split()[:PREAMBLE_WORDS])
+        passages = []
+        for marker, following in zip(markers, markers[1:] + [None]):
+            step = text[marker.end():following.start() if following else len(text)].strip()
+            if step:
+                passages.extend(_word_windows(f"{preamble} {step}".strip(), max_tokens))
+        return passages
+
+    passages, current = [], []
+    for sentence in SENTENCE_PATTERN.split(text):
+        words = sentence.split()
+        if current and len(current) + len(words) > max_tokens:
+            passages.append(" ".join(current))
+            current = []
+        current.extend(words)
+    if current:
+        passages.append(" ".join(current))
+    return [window for passage in passages for window in _word_windows(passage, max_tokens)]
+
+def _word_windows(text: str, max_tokens: int) -> List[str]:
+    words = text.split()
+    return [" ".join(words[start:start + max_tokens]) for start in range(0, len(words), max_tokens)]
+
+def passage_name(max_tokens: int = PASSAGE_MAX_TOKENS) -> str:
+    """Artifact file prefix; passages split with another budget are stored separately"""
+    return f"passages-t{max_tokens}"
+
+class PassageIndex:
+    """Answer passages of every entry, embedded into their own index.
+
+    Passages of entry row r are ids offsets[r]:offsets[r + 1], so a hit maps
+    back to its parent entry with one searchsorted, and an entry's passages
+    can be scored without touching the index.
+    """
+    def __init__(self, offsets: np.ndarray, embeddings: Optional[np.ndarray], index, index_type: str):
+        self.offsets = offsets
+        self.embeddings = embeddings
+        self.index = index
+        self.index_type = index_type
+
+    @property
+    def num_passages(self) -> int:
+        return int(self.offsets[-1])
+
+    def parent_rows(self, passage_ids: np.ndarray) -> np.ndarray:
+        return np.searchsorted(self.offsets, passage_ids, side="right") - 1
+
+    def vectors(self, passage_ids: np.ndarray) -> np.ndarray:
+        if self.embeddings is not None:
+            return np.ascontiguousarray(self.embeddings[passage_ids], dtype="float32")
+        return self.index.reconstruct_batch(np.asarray(passage_ids, dtype="int64"))
+
+    def search(self, query_embeddings: np.ndarray, top_k: int) -> List[Dict[int, float]]:
+        """Best passage score per parent entry, for the passages nearest each query"""
+        if not self.num_passages:
+            return [{} for _ in query_embeddings]
+        scores, ids = self.index.search(query_embeddings, top_k * PASSAGE_OVERFETCH)
+        hits = []
+        for score_row, id_row in zip(scores, ids):
+            found = id_row >= 0
+            best: Dict[int, float] = {}
+            for row, score in zip(self.parent_rows(id_row[found]), score_row[found]):
+                row = int(row)
+                if score > best.get(row, -np.inf):
+                    best[row] = float(score)
+            hits.append(best)
+        return hits
+
+    def max_scores(self, rows: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        """Best passage similarity of each given entry (-inf for entries without passages)"""
+        starts, ends = self.offsets[rows], self.offsets[rows + 1]
+        counts = ends - starts
+        best = np.full(len(rows), -np.inf, dtype="float32")
+        has_passages = counts > 0
+        if not has_passages.any():
+            return best
+        passage_ids = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends) if end > start])
+        scores = self.vectors(passage_ids) @ query_vector
+        group_starts = np.concatenate(([0], np.cumsum(counts[has_passages])[:-1]))
+        best[has_passages] = np.maximum.reduceat(scores, group_starts)
+        return best
+
+    def nbytes(self) -> int:
+        embeddings = 0 if self.embeddings is None or isinstance(self.embeddings, np.memmap) else self.embeddings.nbytes
+        return index_nbytes(self.index) + int(self.offsets.nbytes) + int(embeddings)
+
+    def mapped_nbytes(self) -> int:
+        # Memory-mapped passage vectors live in the page cache, not the heap
+        return int(self.embeddings.nbytes) if isinstance(self.embeddings, np.memmap) else 0
+
+    def drop_embeddings(self):
+        enable_reconstruction(self.index)
+        self.embeddings = None
+
+def count_passages(answers: Iterable[str], max_tokens: int = PASSAGE_MAX_TOKENS) -> np.ndarray:
+    """Passage offsets (num_entries + 1) for the answers of consecutive entries"""
+    counts = [len(split_answer(answer, max_tokens)) for answer in answers]
+    return np.concatenate(([0], np.cumsum(counts, dtype="int64")))
+
+def _iter_passage_chunks(answers: Sequence[str], first_row: int, max_tokens: int) -> Iterator[List[str]]:
+    chunk = []
+    for row in range(first_row, len(answers)):
+        chunk.extend(split_answer(answers[row], max_tokens))
+        if len(chunk) >= ENCODE_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def build_passage_index(answers: Sequence[str], embedder, index_store, version: str, configured_index_type: str,
+                        compact: bool = COMPACT_STORAGE, batch_size: int = 64, reuse: Optional[PassageIndex] = None,
+                        reuse_rows: Optional[np.ndarray] = None, reuse_version: Optional[str] = None,
+                        max_tokens: int = PASSAGE_MAX_TOKENS, read_only: bool = False) -> PassageIndex:
+    """Load the passage index of an artifact, or split, embed and persist it.
+
+    answers are the entries' answers in row order. With reuse, the first
+    len(reuse_rows) entries are rows reuse_rows of an earlier passage index
+    and keep their vectors; only later entries are encoded (used by
+    incremental knowledge base updates). If reuse has dropped its float
+    vectors, they are read from artifact reuse_version, or re-encoded.
+    read_only only loads, and raises FileNotFoundError if the artifact has
+    no complete passage index.
+    """
+    name = passage_name(max_tokens)
+    dimension = embedder.get_sentence_embedding_dimension()
+    offsets = index_store.load_array(version, f"{name}-offsets")
+    embeddings = index_store.load_array(version, f"{name}-embeddings")
+
+    complete = (offsets is not None and embeddings is not None and len(offsets) == len(answers) + 1
+                and len(embeddings) == offsets[-1])
+    if not complete and read_only:
+        raise FileNotFoundError(f"No passage embeddings in knowledge base version {version[:16]}")
+    if not complete:
+        offsets = count_passages(answers, max_tokens)
+        embeddings = index_store.create_array(version, f"{name}-embeddings", (int(offsets[-1]), dimension))
+        if embeddings is None:
+            embeddings = np.empty((int(offsets[-1]), dimension), dtype="float32")
+
+        position = 0
+        first_new_row = 0
+        # Float vectors only: decoding compact index codes would compound quantization error
+        reused = None
+        if reuse is not None and reuse_rows is not None and len(reuse_rows):
+            reused = reuse.embeddings
+            if reused is None and reuse_version is not None:
+                reused = index_store.load_array(reuse_version, f"{name}-embeddings")
+        if reused is not None:
+            first_new_row = len(reuse_rows)
+            for start in range(0, len(reuse_rows), ENCODE_CHUNK_SIZE):
+                rows = reuse_rows[start:start + ENCODE_CHUNK_SIZE]
+                ids = np.concatenate([np.arange(reuse.offsets[row], reuse.offsets[row + 1]) for row in rows])
+                if len(ids):
+                    embeddings[position:position + len(ids)] = reused[ids]
+                position += len(ids)
+
+        for chunk in _iter_passage_chunks(answers, first_new_row, max_tokens):
+            embeddings[position:position + len(chunk)] = embedder.encode(chunk, batch_size=batch_size)
+            position += len(chunk)
+        logger.info(f"Embedded {int(offsets[-1])} answer passages for {len(answers)} entries")
+
+        # Offsets go last: their presence marks the passage embeddings as complete
+        if isinstance(embeddings, np.memmap):
+            embeddings = index_store.commit_array(version, f"{name}-embeddings", embeddings)
+            index_store.save_array(version, f"{name}-offsets", offsets)
+
+    index_type = resolve_index_type(configured_index_type, len(embeddings), compact)
+    signature = f"{name}-{index_signature(index_type, len(embeddings), dimension)}"
+    index = index_store.load_index(version, signature)
+    if index is None:
+        if read_only:
+            raise FileNotFoundError(f"No {signature} index in knowledge base version {version[:16]}")
+        index = build_index(embeddings, index_type)
+        index_store.save_index(version, signature, index)
+    return PassageIndex(offsets, embeddings, configure_search(index), index_type)
@@ -0,0 +1,98 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+QUERY_CACHE_SIZE = int(os.getenv("KB_QUERY_CACHE_SIZE", "10000"))
+QUERY_CACHE_TTL = float(os.getenv("KB_QUERY_CACHE_TTL", "3600"))
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = "?.!,;:।॥ "
+
+def normalize_query(text: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of a question"""
+    return _WHITESPACE.sub(" ", text.strip().lower()).rstrip(_TRAILING_PUNCTUATION)
+
+class CachedSearch:
+    __slots__ = ("vector", "results", "top_k", "expires_at")
+
+    def __init__(self, vector: Optional[np.ndarray], results: List[Dict], top_k: int, expires_at: float):
+        self.vector = vector
+        self.results = results
+        self.top_k = top_k
+        self.expires_at = expires_at
+
+class QueryCache:
+    """Bounded LRU + TTL cache of query vectors and their top-k search results.
+
+    Entries belong to one index version; the first lookup against a newer
+    version drops everything, so a rebuilt index never serves stale hits.
+    Thread-safe, since searches run on the search pool.
+    """
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl_seconds: float = QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, CachedSearch]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str, version: str) -> Optional[CachedSearch]:
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, version: str, vector: Optional[np.ndarray], results: List[Dict], top_k: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = CachedSearch(vector, results, top_k, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+    def _check_version(self, version: str):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.version = version
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .query_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# Answers generated by the model tiers, kept in memory (LRU) and in SQLite on the persistent volume
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# Empty disables the disk tier
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "/data/llm_cache/responses.sqlite3")
+LLM_CACHE_DISK_MAX_ENTRIES = int(os.getenv("LLM_CACHE_DISK_MAX_ENTRIES", "50000"))
+# Writes between trims of the disk tier (expired entries, then the size cap)
+DISK_TRIM_EVERY = 100
+
+CacheKey = Tuple[str, str, str]
+
+class ResponseCache:
+    """Model answers by (normalized question, language, backend), with a TTL.
+
+    Lookups check the in-memory LRU first, then the SQLite tier, which
+    survives restarts and redeploys; disk hits are promoted to memory. The
+    disk tier is trimmed to its size cap, least recently used first. Disk
+    reads and writes run off the event loop.
+    """
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, ttl_seconds: float = LLM_CACHE_TTL,
+                 path: Optional[str] = LLM_CACHE_PATH, disk_max_entries: int = LLM_CACHE_DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        # Expiry is wall-clock time, so entries read back from disk after a restart keep theirs
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict, float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.path = path or None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        if self.path:
+            self._open_db()
+
+    def _open_db(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "question TEXT NOT NULL, language TEXT NOT NULL, backend TEXT NOT NULL, "
+                "result TEXT NOT NULL, expires_at REAL NOT NULL, used_at REAL NOT NULL, "
+                "PRIMARY KEY (question, language, backend))"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+            db.commit()
+            self._db = db
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Response cache disk tier unavailable at {self.path} ({e}); caching in memory only")
+            self.path = None
+
+    async def get(self, question: str, language: str, backends: List[str]) -> Optional[Tuple[str, Dict]]:
+        """(backend, answer) of a live cached answer, preferring the earlier backends, or None"""
+        question = normalize_query(question)
+        now = time.time()
+        for backend in backends:
+            key = (question, language, backend)
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if entry[1] < now:
+                del self._entries[key]
+                continue
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return backend, dict(entry[0])
+
+        if self._db is not None:
+            loop = asyncio.get_running_loop()
+            found = await loop.run_in_executor(None, self._disk_get, question, language, backends, now)
+            if found is not None:
+                backend, answer, expires_at = found
+                self._remember((question, language, backend), answer, expires_at)
+                self.disk_hits += 1
+                return backend, dict(answer)
+        self.misses += 1
+        return None
+
+    async def put(self, question: str, language: str, backend: str, answer: Dict):
+        key = (normalize_query(question), language, backend)
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, answer, expires_at)
+        self.writes += 1
+        if self._db is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._disk_put, key, answer, expires_at)
+
+    def _remember(self, key: CacheKey, answer: Dict, expires_at: float):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (dict(answer), expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, question: str, language: str, backends: List[str],
+                  now: float) -> Optional[Tuple[str, Dict, float]]:
+        with self._db_lock:
+            if self._db is None:
+                return None
+            try:
+                rows = self._db.execute(
+                    "SELECT backend, result, expires_at FROM responses "
+                    "WHERE question = ? AND language = ? AND expires_at >= ?",
+                    (question, language, now)
+                ).fetchall()
+                if not rows:
+                    return None
+                found = {backend: (result, expires_at) for backend, result, expires_at in rows}
+                backend = next((backend for backend in backends if backend in found), None)
+                if backend is None:
+                    return None
+                self._db.execute(
+                    "UPDATE responses SET used_at = ? WHERE question = ? AND language = ? AND backend = ?",
+                    (now, question, language, backend)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache read failed: {e}")
+                return None
+        result, expires_at = found[backend]
+        return backend, json.loads(result), expires_at
+
+    def _disk_put(self, key: CacheKey, answer: Dict, expires_at: float):
+        now = time.time()
+        with self._db_lock:
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, json.dumps(answer, ensure_ascii=False), expires_at, now)
+                )
+                if self.writes % DISK_TRIM_EVERY == 1:
+                    # Drop expired entries, then the least recently used ones past the size cap
+                    self._db.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+                    self._db.execute(
+                        "DELETE FROM responses WHERE rowid IN (SELECT rowid FROM responses "
+                        "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_max_entries,)
+                    )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache write failed: {e}")
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def disk_entries(self) -> Optional[int]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk_path": self.path,
+            "disk_entries": self.disk_entries(),
+            "disk_max_entries": self.disk_max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "writes": self.writes
+        }
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEARCH_EXECUTOR = os.getenv("KB_SEARCH_EXECUTOR", "thread")  # thread | process
+SEARCH_WORKERS = int(os.getenv("KB_SEARCH_WORKERS", "2"))
+
+# Knowledge base of a search worker process, loaded once by _init_worker
+_worker_knowledge_base = None
+
+def _init_worker(index_dir: str, index_type: str, compact: bool, version: str):
+    """Map the published knowledge base version inside a search worker process.
+
+    Read-only: the worker never builds, saves or prunes artifacts, so
+    several workers can start on the same index directory at once.
+    """
+    global _worker_knowledge_base
+    from .knowledge_base import AgricultureKnowledgeBase
+    _worker_knowledge_base = AgricultureKnowledgeBase(index_dir=index_dir, index_type=index_type,
+                                                      compact=compact, version=version)
+
+def _search_in_worker(queries: List[str], top_k: int, filters: Optional[Dict[str, str]]):
+    return _timed_search(_worker_knowledge_base, queries, top_k, filters)
+
+def _timed_search(knowledge_base, queries: List[str], top_k: int, filters: Optional[Dict[str, str]] = None):
+    started = time.time()
+    results = knowledge_base.search_knowledge_batch(queries, top_k, filters)
+    return results, started, time.time()
+
+class SearchExecutor:
+    """Runs embedding and FAISS search on a dedicated pool instead of the event loop.
+
+    Thread mode shares the process's knowledge base (torch and FAISS release
+    the GIL while they compute). Process mode maps the published index
+    artifact in each worker process, for CPU-bound deployments where
+    tokenization and result assembly would still contend for the GIL.
+    Workers are spawned rather than forked, since torch has already
+    started its thread pools in this process.
+    """
+    def __init__(self, knowledge_base, mode: str = SEARCH_EXECUTOR, workers: int = SEARCH_WORKERS):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown search executor mode '{mode}' (expected thread or process)")
+        if mode == "process" and not self._published(knowledge_base):
+            logger.warning(f"Knowledge base index is not persisted in {knowledge_base.index_store.index_dir}; "
+                           f"worker processes cannot map it, so searches run on threads")
+            mode = "thread"
+        self.knowledge_base = knowledge_base
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.pool = self._create_pool(knowledge_base)
+        self._retired_pools = []
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    async def search(self, query: str, top_k: int = 3, filters: Optional[Dict[str, str]] = None) -> List[Dict]:
+        return (await self.search_batch([query], top_k, filters))[0]
+
+    async def search_batch(self, queries: List[str], top_k: int = 3,
+                           filters: Optional[Dict[str, str]] = None) -> List[List[Dict]]:
+        """Search on the pool; the event loop stays free while the search runs"""
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self.in_flight += 1
+        try:
+            if self.mode == "process":
+                call = loop.run_in_executor(self.pool, _search_in_worker, queries, top_k, filters)
+            else:
+                call = loop.run_in_executor(self.pool, _timed_search, self.knowledge_base, queries, top_k,
+                                            filters)
+            results, started, finished = await call
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self.total_wait += max(0.0, started - submitted)
+        self.total_run += finished - started
+        return results
+
+    def swap(self, knowledge_base):
+        """Send new searches to another knowledge base version.
+
+        Searches already submitted finish on the old one: in thread mode they
+        hold a reference to it, in process mode the old pool keeps running
+        until drain() has seen its workers exit. A version that is not on
+        disk cannot be loaded by worker processes, so swapping to one in
+        process mode raises instead of leaving the workers on the old one.
+        """
+        if self.mode == "process":
+            if not self._published(knowledge_base):
+                raise RuntimeError(f"Knowledge base version {knowledge_base.index_version[:16]} could not be "
+                                   f"persisted to {knowledge_base.index_store.index_dir}; search worker "
+                                   f"processes cannot load it")
+            self._retired_pools.append(self.pool)
+            self.pool = self._create_pool(knowledge_base)
+        self.knowledge_base = knowledge_base
+
+    async def drain(self):
+        """Wait until the pools of earlier versions have finished their searches and exited"""
+        loop = asyncio.get_running_loop()
+        while self._retired_pools:
+            await loop.run_in_executor(None, self._retired_pools.pop(0).shutdown)
+
+    @staticmethod
+    def _published(knowledge_base) -> bool:
+        return knowledge_base.index_store.exists(knowledge_base.index_version)
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "active": min(self.in_flight, self.workers),
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_queue_wait_ms": round(1000 * self.total_wait / self.completed, 3) if self.completed else 0.0,
+            "avg_search_ms": round(1000 * self.total_run / self.completed, 3) if self.completed else 0.0
+        }
+
+    def _create_pool(self, knowledge_base):
+        if self.mode == "process":
+            return ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(knowledge_base.index_store.index_dir, knowledge_base.configured_index_type,
+                          knowledge_base.compact, knowledge_base.index_version)
+            )
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kb-search")
+
+    def shutdown(self):
+        for pool in [*self._retired_pools, self.pool]:
+            pool.shutdown(wait=False, cancel_futures=True)
+        self._retired_pools = []
@@ -0,0 +1,161 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from .query_cache import normalize_query
+
+# Model answers served again for questions this similar (cosine) to one already answered
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# 0 disables the semantic cache
+SEMANTIC_CACHE_SIZE = int(os.getenv("LLM_SEMANTIC_CACHE_SIZE", "5000"))
+SEMANTIC_CACHE_TTL = float(os.getenv("LLM_SEMANTIC_CACHE_TTL", str(3 * 24 * 3600)))
+# Neighbours checked per lookup, since the closest ones may be in another language or expired
+SEMANTIC_CACHE_CANDIDATES = 8
+# Share of the entries dropped at once when the cache is full, so eviction is not paid on every insert
+EVICTION_FRACTION = 0.1
+# Vectors of recent misses, reused when their answer is stored
+PENDING_VECTORS = 256
+
+class SemanticEntry:
+    __slots__ = ("question", "language", "backend", "answer", "expires_at", "hits", "used_at")
+
+    def __init__(self, question: str, language: str, backend: str, answer: Dict, expires_at: float):
+        self.question = question
+        self.language = language
+        self.backend = backend
+        self.answer = answer
+        self.expires_at = expires_at
+        self.hits = 0
+        self.used_at = time.time()
+
+class SemanticCache:
+    """Model answers found by question similarity, for paraphrases of questions already answered.
+
+    Questions are embedded with the knowledge base embedder into a small
+    flat inner-product index of their own; a lookup returns the closest
+    live answer in the same language above the threshold. Entries expire
+    after a TTL, and a full cache drops its least-hit, least recently used
+    entries first. Embedding and index work run off the event loop.
+    """
+    def __init__(self, embedder, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_SIZE, ttl_seconds: float = SEMANTIC_CACHE_TTL):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(embedder.get_sentence_embedding_dimension()))
+        self.entries: Dict[int, SemanticEntry] = {}
+        self._next_id = 0
+        self._pending: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    async def get(self, question: str, language: str) -> Optional[Tuple[str, Dict]]:
+        """(backend, answer) of the closest cached question above the threshold, or None"""
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._lookup, question, language)
+
+    async def put(self, question: str, language: str, backend: str, answer: Dict):
+        if not self.enabled:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._insert, question, language, backend, answer)
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.ascontiguousarray(self.embedder.encode([question]), dtype='float32')
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _lookup(self, question: str, language: str) -> Optional[Tuple[str, Dict]]:
+        key = normalize_query(question)
+        vector = self._embed(key)
+        now = time.time()
+        with self._lock:
+            match = None
+            if self.index.ntotal:
+                scores, ids = self.index.search(vector, min(SEMANTIC_CACHE_CANDIDATES, self.index.ntotal))
+                expired = []
+                for score, entry_id in zip(scores[0], ids[0]):
+                    entry = self.entries.get(int(entry_id))
+                    if entry is None or score < self.threshold:
+                        continue
+                    if entry.expires_at < now:
+                        expired.append(int(entry_id))
+                        continue
+                    if entry.language == language:
+                        match = entry
+                        break
+                if expired:
+                    self._remove(expired)
+                    self.expirations += len(expired)
+            if match is None:
+                self.misses += 1
+                self._pending[key] = vector
+                while len(self._pending) > PENDING_VECTORS:
+                    self._pending.popitem(last=False)
+                return None
+            match.hits += 1
+            match.used_at = now
+            self.hits += 1
+            return match.backend, dict(match.answer)
+
+    def _insert(self, question: str, language: str, backend: str, answer: Dict):
+        key = normalize_query(question)
+        with self._lock:
+            vector = self._pending.pop(key, None)
+        if vector is None:
+            vector = self._embed(key)
+        with self._lock:
+            if len(self.entries) >= self.max_entries:
+                self._evict()
+            entry_id = self._next_id
+            self._next_id += 1
+            self.entries[entry_id] = SemanticEntry(key, language, backend, dict(answer), time.time() + self.ttl_seconds)
+            self.index.add_with_ids(vector, np.array([entry_id], dtype='int64'))
+
+    def _evict(self):
+        """Drop the expired entries, or failing that the least-hit, least recently used ones"""
+        now = time.time()
+        expired = [entry_id for entry_id, entry in self.entries.items() if entry.expires_at < now]
+        if expired:
+            self._remove(expired)
+            self.expirations += len(expired)
+            return
+        count = max(1, int(len(self.entries) * EVICTION_FRACTION))
+        ranked = sorted(self.entries, key=lambda entry_id: (self.entries[entry_id].hits, self.entries[entry_id].used_at))
+        self._remove(ranked[:count])
+        self.evictions += count
+
+    def _remove(self, entry_ids: List[int]):
+        for entry_id in entry_ids:
+            self.entries.pop(entry_id, None)
+        self.index.remove_ids(np.array(entry_ids, dtype='int64'))
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,53 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Longest a caller waits on a shared generation before getting a fallback answer; 0 waits as long as it takes
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "0"))
+
+class SingleFlight:
+    """One call per key at a time; concurrent callers with the same key share its result.
+
+    The call runs as its own task, shielded from the callers: a caller that
+    times out or is cancelled stops waiting, but the call carries on for the
+    others (and fills the answer caches for whoever asks next). The key is
+    released as soon as the call finishes, so later callers start afresh.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """Result of call(), or of the identical call already in flight; raises asyncio.TimeoutError after timeout"""
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.create_task(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._release(key, done))
+            self.calls += 1
+        else:
+            self.shared += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout or None)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    def _release(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Every caller may have stopped waiting; don't log a failure as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "shared": self.shared,
+            "timeouts": self.timeouts
+        }
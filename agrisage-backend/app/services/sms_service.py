@@ -198,8 +198,11 @@ class SMSQueryProcessor:
             # Detect language
             language = self.sms_manager.detect_language(question)
             
+            # "RICE: leaves turning yellow" restricts the knowledge search to one crop
+            question, filters = self.parse_crop_prefix(question)
+            
             # Get AI response
-            ai_response = await self.agrisage_service.generate_response_free(question, language)
+            ai_response = await self.agrisage_service.generate_response_free(question, language, filters=filters)
             
             # Send SMS response
             sms_result = await self.sms_manager.send_sms_smart_routing(
@@ -227,6 +230,17 @@ class SMSQueryProcessor:
             )
             return {"success": False, "error": str(e)}
     
+    def parse_crop_prefix(self, question: str):
+        """Split an optional "<crop>:" prefix off a question into knowledge search filters"""
+        prefix, separator, rest = question.partition(':')
+        if not separator or not rest.strip():
+            return question, None
+        crop = prefix.strip().lower()
+        knowledge_base = getattr(self.agrisage_service, 'knowledge_base', None)
+        if knowledge_base is None or crop not in knowledge_base.partition_values('crop'):
+            return question, None
+        return rest.strip(), {"crop": crop}
+    
     async def send_help_message(self, to_number: str) -> Dict:
         """Send help/welcome message"""
         help_text = """Welcome to AgriSage AI! 🌾
@@ -238,6 +252,7 @@ Send your agricultural questions via SMS:
 • Government schemes
 
 Example: "What fertilizer for wheat?"
+Start with a crop name to get answers for that crop only, e.g. "RICE: leaves turning yellow"
 
 FREE service for farmers!"""
         
@@ -0,0 +1,51 @@
+import json
+import time
+from typing import AsyncIterator, Dict
+
+import aiohttp
+
+# Keep proxies (nginx, Render) from buffering the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Response fields carried by the final "done" event, as returned by /ask
+DONE_FIELDS = ("confidence", "model_used", "source", "success", "cost")
+
+def token_event(text: str) -> Dict:
+    return {"event": "token", "text": text}
+
+def done_event(result: Dict) -> Dict:
+    event = {"event": "done"}
+    event.update((field, result[field]) for field in DONE_FIELDS if field in result)
+    return event
+
+async def result_events(result: Dict) -> AsyncIterator[Dict]:
+    """Events of a tier that answers in one piece (knowledge base, hosted APIs)"""
+    yield token_event(result["response"])
+    yield done_event(result)
+
+async def iter_ndjson(response: aiohttp.ClientResponse) -> AsyncIterator[Dict]:
+    """Objects of a newline-delimited JSON body, as each line arrives"""
+    async for line in response.content:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def sse_event(event: str, data: Dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def sse_stream(events: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    """Server-Sent Events for an orchestrator event stream, with timings on the done event"""
+    started_at = time.time()
+    first_token_at = None
+    try:
+        async for event in events:
+            event = dict(event)
+            kind = event.pop("event")
+            if kind == "token" and first_token_at is None:
+                first_token_at = time.time()
+            if kind == "done":
+                event["processing_time"] = time.time() - started_at
+                event["time_to_first_token"] = first_token_at - started_at if first_token_at else None
+            yield sse_event(kind, event)
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Error processing question: {str(e)}"})
@@ -0,0 +1,213 @@
+import asyncio
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .translation_store import TranslationStore
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "5000"))
+# Directory for the on-disk tier (a translations.sqlite3 file); empty keeps the cache in memory only
+TRANSLATION_CACHE_DIR = os.getenv("TRANSLATION_CACHE_DIR", "")
+# Texts sent to the translator in one request, and how long a text waits for others to join it
+TRANSLATION_BATCH_SIZE = int(os.getenv("TRANSLATION_BATCH_SIZE", "16"))
+TRANSLATION_BATCH_WAIT_MS = float(os.getenv("TRANSLATION_BATCH_WAIT_MS", "10"))
+
+# Translates texts from one language into another; returns, in order, each translation with the
+# source language the backend detected for it (None when it does not say)
+BatchTranslate = Callable[[List[str], str, str], Awaitable[List[Tuple[str, Any]]]]
+
+class TranslationCache:
+    """Translations by content hash of the text and target language: LRU, plus an optional disk tier"""
+    def __init__(self, max_entries: int = TRANSLATION_CACHE_SIZE, cache_dir: str = TRANSLATION_CACHE_DIR):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, Any]]" = OrderedDict()
+        self.disk = TranslationStore(cache_dir) if cache_dir else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, target_language: str) -> Tuple[str, str]:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest(), target_language
+
+    async def get(self, text: str, target_language: str) -> Optional[Tuple[str, Any]]:
+        """The translation and its detected source language (None for translations from the disk tier)"""
+        key = self.key(text, target_language)
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached
+        if self.disk is not None:
+            translated = await self.disk.get(text, target_language)
+            if translated is not None:
+                self._remember(key, (translated, None))
+                self.disk_hits += 1
+                return translated, None
+        self.misses += 1
+        return None
+
+    async def put_many(self, target_language: str, translations: List[Tuple[str, str, Any]]):
+        """Store (text, translation, detected source language) triples; memory first, then one disk write"""
+        for text, translated, detected_language in translations:
+            self._remember(self.key(text, target_language), (translated, detected_language))
+        if self.disk is not None:
+            await self.disk.put_many((text, target_language, translated) for text, translated, _ in translations)
+
+    def _remember(self, key: Tuple[str, str], cached: Tuple[str, Any]):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = cached
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "disk_path": self.disk.path if self.disk is not None else None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+        }
+
+class BatchingTranslator:
+    """Cache, request coalescing and batching in front of a translation backend.
+
+    A cached text is answered without a request. Concurrent requests for the
+    same text and languages share one pending translation, and texts for the
+    same language pair arriving within max_wait_ms of each other (up to
+    max_batch_size) go to the backend as one request. A caller that is
+    cancelled does not cancel the translation the others are waiting for.
+    """
+    def __init__(self, translate_batch: BatchTranslate, cache: Optional[TranslationCache] = None,
+                 max_batch_size: int = TRANSLATION_BATCH_SIZE, max_wait_ms: float = TRANSLATION_BATCH_WAIT_MS):
+        self.translate_batch = translate_batch
+        self.cache = cache if cache is not None else TranslationCache()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self._pending: Dict[Tuple[str, str], List[str]] = {}
+        self._timers: Dict[Tuple[str, str], asyncio.TimerHandle] = {}
+        self._dispatches = set()
+        self.requests = 0
+        self.texts = 0
+        self.coalesced = 0
+
+    async def translate(self, text: str, target_language: str, source_language: str = "auto") -> str:
+        """The translation of text; raises if the backend request for it failed"""
+        return (await self.translate_detected(text, target_language, source_language))[0]
+
+    async def translate_detected(self, text: str, target_language: str,
+                                 source_language: str = "auto") -> Tuple[str, Any]:
+        """The translation of text and the source language the backend detected (None if unknown)"""
+        cached = await self.cache.get(text, target_language)
+        if cached is not None:
+            return cached
+
+        key = (source_language, target_language, text)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._enqueue(source_language, target_language, text)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    async def translate_many(self, texts: List[str], target_language: str,
+                             source_language: str = "auto") -> List[Optional[str]]:
+        """Translations of several texts (None for the ones that failed), sent in as few requests as possible"""
+        results = await asyncio.gather(*(self.translate(text, target_language, source_language) for text in texts),
+                                       return_exceptions=True)
+        return [None if isinstance(result, BaseException) else result for result in results]
+
+    def _enqueue(self, source_language: str, target_language: str, text: str):
+        pair = (source_language, target_language)
+        pending = self._pending.setdefault(pair, [])
+        pending.append(text)
+        if len(pending) >= self.max_batch_size:
+            self._flush(pair)
+        elif pair not in self._timers:
+            self._timers[pair] = asyncio.get_running_loop().call_later(self.max_wait, self._flush, pair)
+
+    def _flush(self, pair: Tuple[str, str]):
+        timer = self._timers.pop(pair, None)
+        if timer is not None:
+            timer.cancel()
+        texts = self._pending.pop(pair, [])
+        if texts:
+            task = asyncio.create_task(self._dispatch(pair, texts))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, pair: Tuple[str, str], texts: List[str]):
+        source_language, target_language = pair
+        keys = [(source_language, target_language, text) for text in texts]
+        futures = [self._inflight[key] for key in keys]
+        try:
+            translations = await self.translate_batch(texts, target_language, source_language)
+            if len(translations) != len(texts):
+                raise RuntimeError(f"Translator returned {len(translations)} translations for {len(texts)} texts")
+        except asyncio.CancelledError:
+            self._fail(futures, RuntimeError("Translator closed"))
+            raise
+        except Exception as e:
+            self._fail(futures, e)
+            return
+        finally:
+            # Identical texts asked for while this request was out joined it; later ones start anew
+            for key in keys:
+                self._inflight.pop(key, None)
+
+        self.requests += 1
+        self.texts += len(texts)
+        for (translated, detected_language), future in zip(translations, futures):
+            if not future.done():
+                future.set_result((translated, detected_language))
+        # The memory tier is filled before the first await, so a repeat of these texts finds them
+        await self.cache.put_many(target_language, [(text, translated, detected_language)
+                                                    for text, (translated, detected_language) in zip(texts, translations)])
+
+    @staticmethod
+    def _fail(futures: List[asyncio.Future], error: Exception):
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+                # Every caller may have been cancelled; don't log the error as never retrieved
+                future.exception()
+
+    async def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        # Texts still waiting for their batch would otherwise leave their callers waiting forever
+        for (source_language, target_language), texts in self._pending.items():
+            self._fail([self._inflight.pop((source_language, target_language, text)) for text in texts],
+                       RuntimeError("Translator closed"))
+        self._pending.clear()
+        for task in list(self._dispatches):
+            task.cancel()
+        self.cache.close()
+
+    def stats(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.requests, 2) if self.requests else 0.0,
+            "coalesced": self.coalesced,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "cache": self.cache.stats()
+        }
@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Translations in flight while precomputing; the client batches them into fewer requests,
+# since the public LibreTranslate throttles bursts
+TRANSLATION_CONCURRENCY = int(os.getenv("KB_TRANSLATION_CONCURRENCY", "16"))
+PRECOMPUTE_SLICE = 1000
+
+class TranslationStore:
+    """Translations of knowledge base answers by (answer text hash, language).
+
+    Kept in SQLite in the index directory, next to the index artifacts. Keys
+    are content hashes, so every knowledge base version shares the
+    translations of the answers it has in common with the others, and
+    entries added later only need their own. Reads and writes run off the
+    event loop, since the disk can stall a request behind them.
+    """
+    FILE = "translations.sqlite3"
+
+    def __init__(self, index_dir: str):
+        self.path = os.path.join(index_dir, self.FILE)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        try:
+            os.makedirs(index_dir, exist_ok=True)
+            self._db = self._connect(self.path)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Translation store unavailable at {self.path} ({e}); keeping translations in memory")
+            self.path = None
+            self._db = self._connect(":memory:")
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "answer_hash TEXT NOT NULL, language TEXT NOT NULL, text TEXT NOT NULL, created_at REAL NOT NULL, "
+            "PRIMARY KEY (answer_hash, language))"
+        )
+        db.commit()
+        return db
+
+    @staticmethod
+    def answer_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    async def get(self, text: str, language: str) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        translated = await loop.run_in_executor(None, self._get, text, language)
+        if translated is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return translated
+
+    async def put(self, text: str, language: str, translated: str):
+        await self.put_many([(text, language, translated)])
+
+    async def put_many(self, translations: Iterable[Tuple[str, str, str]]):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._put_many, list(translations))
+
+    def _get(self, text: str, language: str) -> Optional[str]:
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT text FROM translations WHERE answer_hash = ? AND language = ?",
+                    (self.answer_hash(text), language)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read translations: {e}")
+            return None
+        return row[0] if row is not None else None
+
+    def _put_many(self, translations: List[Tuple[str, str, str]]):
+        now = time.time()
+        rows = [(self.answer_hash(text), language, translated, now) for text, language, translated in translations]
+        try:
+            with self._lock:
+                self._db.executemany("INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)", rows)
+                self._db.commit()
+            self.writes += len(rows)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store translations: {e}")
+
+    def missing(self, text: str, languages: Iterable[str]) -> List[str]:
+        """Languages the answer has no stored translation in"""
+        with self._lock:
+            present = {language for (language,) in self._db.execute(
+                "SELECT language FROM translations WHERE answer_hash = ?", (self.answer_hash(text),)
+            )}
+        return [language for language in languages if language not in present]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            languages = dict(self._db.execute("SELECT language, COUNT(*) FROM translations GROUP BY language"))
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "translations": languages,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes
+        }
+
+async def precompute_translations(knowledge_base, translator, store: TranslationStore,
+                                  languages: Optional[List[str]] = None,
+                                  concurrency: int = TRANSLATION_CONCURRENCY) -> Dict:
+    """Translate every distinct knowledge base answer into each language it has no stored translation in.
+
+    Each answer is translated from its entry's language. Failed translations
+    are counted and left for the on-demand path to fill in later.
+    """
+    languages = languages or list(translator.supported_languages)
+    entries = knowledge_base.knowledge_base
+    # Answers are pooled in the store, so repeated answers are translated once
+    todo: Dict[Tuple[str, str], List[str]] = {}
+    for row in range(len(entries)):
+        answer = entries.value(row, 'answer')
+        source = entries.value(row, 'language') or 'en'
+        if (answer, source) not in todo:
+            todo[(answer, source)] = store.missing(answer, [language for language in languages if language != source])
+    jobs = [(answer, source, target) for (answer, source), targets in todo.items() for target in targets]
+
+    slots = asyncio.Semaphore(max(1, concurrency))
+    counts = {"answers": len(todo), "translated": 0, "failed": 0}
+    started_at = time.time()
+
+    async def translate(answer: str, source: str, target: str):
+        async with slots:
+            result = await translator.translate_text(answer, target, source)
+        if result["success"]:
+            await store.put(answer, target, result["translated_text"])
+            counts["translated"] += 1
+        else:
+            counts["failed"] += 1
+            logger.debug(f"Translation to {target} failed: {result.get('error')}")
+        done = counts["translated"] + counts["failed"]
+        if done % 500 == 0:
+            logger.info(f"Translated {done}/{len(jobs)} answers")
+
+    # In slices, so a large corpus does not create every request coroutine up front
+    for start in range(0, len(jobs), PRECOMPUTE_SLICE):
+        await asyncio.gather(*(translate(*job) for job in jobs[start:start + PRECOMPUTE_SLICE]))
+    counts["seconds"] = round(time.time() - started_at, 1)
+    return counts
+
+if __name__ == "__main__":
+    # Usage: python -m app.services.translation_store [corpus.jsonl] [language ...]
+    # Precomputes translations of every knowledge base answer into the
+    # LibreTranslate languages (or the given ones) before deploying.
+    import sys
+    from .http_client import HTTPClientPool
+    from .improved_free_ai_clients import LibreTranslateClient
+    from .knowledge_base import AgricultureKnowledgeBase
+
+    async def main():
+        http = HTTPClientPool()
+        try:
+            print(await precompute_translations(kb, LibreTranslateClient(http), store, sys.argv[2:] or None))
+        finally:
+            await http.close()
+            store.close()
+
+    logging.basicConfig(level=logging.INFO)
+    kb = AgricultureKnowledgeBase(corpus_path=sys.argv[1] if len(sys.argv) > 1 else None)
+    store = TranslationStore(kb.index_store.index_dir)
+    asyncio.run(main())